@@ -0,0 +1,4 @@
+"""Performance benchmarks for the scheduler.
+
+Run from the repository root with ``python -m benchmarks``; see run.py.
+"""
@@ -0,0 +1,225 @@
+"""Microbenchmarks and end-to-end solver runs with a JSON report.
+
+    python -m benchmarks                         # all sizes, compare with baseline.json
+    python -m benchmarks --sizes small medium --output report.json
+    python -m benchmarks --check                 # exit 1 on a regression
+    python -m benchmarks --update-baseline       # store this run as the new baseline
+
+Timings are machine dependent; refresh the baseline when moving to new
+hardware rather than comparing across machines.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+import numpy as np
+
+from make_schedule import (energy_function, energy_function_batch, get_actor_call_times, get_neighbour,
+                           propose_move, IncrementalEnergy, MoveGenerator, SolverRandom, make_schedule)
+from benchmarks.synthetic import SIZES, generate_size
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# rehearsal window (min_hours, max_hours) per size
+HOURS = {
+    'small': (2, 3),
+    'medium': (3, 4),
+    'large': (6, 8),
+}
+
+# end-to-end scenarios: name suffix -> make_schedule keyword arguments
+END_TO_END = {
+    'anneal': dict(solver='anneal', step_max=10000),
+    'adaptive': dict(solver='anneal', step_max=10000, cooling='adaptive', calibrate_t=True),
+}
+
+
+class Problem:
+    """One synthetic production plus the arguments every benchmark needs."""
+
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.sa_matrix, self.actors_list, self.scene_time = generate_size(size, seed)
+        self.min_hours, self.max_hours = HOURS[size]
+        n_scenes = len(self.sa_matrix)
+        # ignore the last actor, require the first two scenes they are not in and avoid the last scene
+        self.actors_to_ignore = [len(self.actors_list)]
+        free = np.flatnonzero(self.sa_matrix[:, -1] == 0)
+        self.scenes_to_include = [int(s) + 1 for s in free[:2]]
+        self.scenes_to_avoid = [n_scenes]
+        self.include_0idx = [s - 1 for s in self.scenes_to_include]
+        self.avoid_0idx = [s - 1 for s in self.scenes_to_avoid]
+        self.state = self.sample_state(np.random.default_rng(seed))
+
+    def sample_state(self, rng):
+        # random order of allowed scenes filling roughly the rehearsal window
+        allowed = [s for s in rng.permutation(len(self.sa_matrix)) if s not in self.avoid_0idx]
+        state, total = [], 0
+        for scene in allowed:
+            if total + self.scene_time[scene] > self.max_hours * 60:
+                break
+            state.append(int(scene))
+            total += self.scene_time[scene]
+        return state
+
+
+def time_call(fn, repeat=5, min_time=0.2):
+    """Median seconds per call of fn() over `repeat` timed batches."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    return statistics.median(t / number for t in timer.repeat(repeat=repeat, number=number))
+
+
+def run_micro(problem):
+    p = problem
+    evaluator = IncrementalEnergy(p.state, p.sa_matrix, p.scene_time, p.max_hours, p.min_hours,
+                                  p.actors_to_ignore, p.avoid_0idx)
+    rng = np.random.default_rng(1)
+    batch = [p.sample_state(rng) for _ in range(32)]
+    solver_rng = SolverRandom(1)
+    moves = [propose_move(p.state, p.avoid_0idx, p.include_0idx, p.sa_matrix, rng=solver_rng) for _ in range(64)]
+    moves = [move for move in moves if move is not None]
+    move_iter = itertools.cycle(moves)
+    generator = MoveGenerator(p.state, len(p.sa_matrix), p.avoid_0idx, p.include_0idx, rng=solver_rng)
+
+    benchmarks = {
+        'energy_function': lambda: energy_function(
+            p.state, p.sa_matrix, p.scene_time, p.max_hours, p.min_hours, p.actors_to_ignore,
+            p.actors_list, p.avoid_0idx),
+        'energy_function_batch_32': lambda: energy_function_batch(
+            batch, p.sa_matrix, p.scene_time, p.max_hours, p.min_hours, p.actors_to_ignore, p.avoid_0idx),
+        'incremental_move_energy': lambda: evaluator.move_energy(next(move_iter)),
+        'get_neighbour': lambda: get_neighbour(p.state, p.avoid_0idx, p.include_0idx, p.sa_matrix,
+                                                solver_rng),
+        'move_generator_propose': lambda: generator.propose(p.state),
+        'get_actor_call_times': lambda: get_actor_call_times(p.state, p.actors_list, p.scene_time, p.sa_matrix),
+    }
+    return {f"micro/{name}/{p.size}": {"seconds_per_call": time_call(fn)} for name, fn in benchmarks.items()}
+
+
+def run_end_to_end(problem, seed=0, n_seeds=5):
+    """Solves each scenario with seeds seed .. seed + n_seeds - 1.
+
+    One seed's final energy varies too much to gate on, so final_energy is
+    the median over the seeds (all of them in final_energies); breakdown
+    and n_scenes are those of the median run, wall_seconds and steps the
+    median per run. Steps come from make_schedule's stats.
+    """
+    p = problem
+    results = {}
+    for scenario, kwargs in END_TO_END.items():
+        runs = []
+        for run_seed in range(seed, seed + n_seeds):
+            stats = {}
+            start = time.perf_counter()
+            state, energy, _, _, breakdown = make_schedule(
+                p.max_hours, p.min_hours, p.sa_matrix, p.scene_time, p.actors_list, p.actors_to_ignore,
+                p.scenes_to_include, p.scenes_to_avoid, seed=run_seed, stats=stats, **kwargs)
+            runs.append((float(energy), time.perf_counter() - start, stats['steps'], len(state), breakdown))
+        energies = [run[0] for run in runs]
+        median_run = sorted(runs, key=lambda run: run[0])[(len(runs) - 1) // 2]
+        total_steps = sum(run[2] for run in runs)
+        total_wall = sum(run[1] for run in runs)
+        results[f"e2e/{scenario}/{p.size}"] = {
+            "wall_seconds": statistics.median(run[1] for run in runs),
+            "steps": statistics.median(run[2] for run in runs),
+            "steps_per_second": total_steps / total_wall,
+            "final_energy": statistics.median(energies),
+            "final_energies": energies,
+            "n_scenes": median_run[3],
+            "breakdown": {key: float(value) for key, value in median_run[4].items()},
+        }
+    return results
+
+
+def compare(results, baseline, time_tolerance, energy_tolerance):
+    """Adds baseline values and ratios to results; returns the list of regressions."""
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        metrics["baseline"] = {key: base[key] for key in base if key not in ("breakdown", "final_energies")}
+        for key in ('seconds_per_call', 'wall_seconds'):
+            if key in metrics and base.get(key):
+                ratio = metrics[key] / base[key]
+                metrics[key + "_ratio"] = ratio
+                if ratio > 1 + time_tolerance:
+                    regressions.append(f"{name}: {key} {metrics[key]:.6g} vs baseline {base[key]:.6g} ({ratio:.2f}x)")
+        if 'final_energy' in metrics and 'final_energy' in base:
+            limit = base['final_energy'] + energy_tolerance * max(abs(base['final_energy']), 1)
+            if metrics['final_energy'] > limit:
+                regressions.append(f"{name}: final_energy {metrics['final_energy']:.6g} vs baseline "
+                                   f"{base['final_energy']:.6g}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES))
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--skip-e2e', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--e2e-seeds', type=int, default=5,
+                        help="end-to-end runs per scenario (seeds --seed and up); their median energy is compared")
+    parser.add_argument('--output', help="write the JSON report here (default: stdout)")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true', help="exit with status 1 if anything regressed")
+    parser.add_argument('--time-tolerance', type=float, default=0.25,
+                        help="allowed slowdown as a fraction of the baseline time")
+    parser.add_argument('--energy-tolerance', type=float, default=0.05,
+                        help="allowed increase of the median final energy as a fraction of the baseline")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for size in args.sizes:
+        problem = Problem(size, args.seed)
+        print(f"{size}: {len(problem.sa_matrix)} scenes x {len(problem.actors_list)} actors", file=sys.stderr)
+        if not args.skip_micro:
+            results.update(run_micro(problem))
+        if not args.skip_e2e:
+            results.update(run_end_to_end(problem, args.seed, args.e2e_seeds))
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("results", {})
+    regressions = compare(results, baseline, args.time_tolerance, args.energy_tolerance)
+
+    report = {
+        "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": results,
+        "regressions": regressions,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.update_baseline:
+        stored = {name: {key: value for key, value in metrics.items()
+                         if key != "baseline" and not key.endswith("_ratio")}
+                  for name, metrics in results.items()}
+        baseline.update(stored)
+        with open(args.baseline, 'w') as f:
+            json.dump({"python": report["python"], "numpy": report["numpy"], "platform": report["platform"],
+                       "results": baseline}, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    if args.check and regressions:
+        sys.exit(1)
@@ -0,0 +1,52 @@
+import csv
+import numpy as np
+
+# (n_scenes, n_actors) per named size
+SIZES = {
+    'small': (20, 10),
+    'medium': (100, 40),
+    'large': (400, 150),
+}
+
+
+def generate_production(n_scenes, n_actors, seed=0, mean_cast=None):
+    """Seeded synthetic production in the same shape load_data returns.
+
+    Actors get Zipf-like popularity: a few leads appear in a large share of
+    scenes, most of the ensemble in only a handful. Cast sizes per scene are
+    Poisson around mean_cast (default: about 8% of the company, at least 2)
+    and scene lengths are 5 to 45 minutes, rounded to 5.
+
+    Returns (sa_matrix, actor_names, scene_times).
+    """
+    rng = np.random.default_rng(seed)
+    if mean_cast is None:
+        mean_cast = max(2.0, 0.08 * n_actors)
+
+    popularity = 1.0 / np.arange(1, n_actors + 1) ** 0.8
+    popularity = popularity[rng.permutation(n_actors)]
+    popularity /= popularity.sum()
+
+    sa_matrix = np.zeros((n_scenes, n_actors), dtype=int)
+    for scene in range(n_scenes):
+        cast_size = int(np.clip(rng.poisson(mean_cast), 1, n_actors))
+        cast = rng.choice(n_actors, size=cast_size, replace=False, p=popularity)
+        sa_matrix[scene, cast] = 1
+
+    scene_times = [int(t) for t in rng.integers(1, 10, n_scenes) * 5]
+    actor_names = [f"Actor {i + 1}" for i in range(n_actors)]
+    return sa_matrix, actor_names, scene_times
+
+
+def generate_size(size, seed=0):
+    n_scenes, n_actors = SIZES[size]
+    return generate_production(n_scenes, n_actors, seed=seed)
+
+
+def write_csv(path, sa_matrix, actor_names, scene_times):
+    """Writes a production in the CSV layout load_data reads (0/1 grid, times as index)."""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Scene time'] + list(actor_names))
+        for scene_time, row in zip(scene_times, sa_matrix):
+            writer.writerow([scene_time] + [int(v) for v in row])
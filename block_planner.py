@@ -0,0 +1,252 @@
+import random
+import numpy as np
+
+from make_schedule import energy_function, energy_function_batch, get_counted_actors, get_solver_pool, make_schedule
+
+
+class RehearsalDay:
+    """One day of a rehearsal block: its hour window and the actors (1-based) who cannot come."""
+
+    __slots__ = ('name', 'max_hours', 'min_hours', 'unavailable_actors')
+
+    def __init__(self, name, max_hours, min_hours=0, unavailable_actors=()):
+        self.name = name
+        self.max_hours = max_hours
+        self.min_hours = min_hours
+        self.unavailable_actors = tuple(unavailable_actors)
+
+
+class BlockProblem:
+    """A production and the days of a block, compiled once for planning.
+
+    An unavailable actor is handled like an ignored actor in make_schedule:
+    a scene they are in may not be rehearsed that day. `feasible[scene, day]`
+    says where each scene may go; scenes feasible on no day end up in
+    `unplaceable` and are left out of the plan.
+    """
+
+    __slots__ = ('sa_matrix', 'scene_time', 'actors_list', 'days', 'day_ignore', 'max_minutes', 'min_minutes',
+                 'counted', 'cast', 'feasible', 'unplaceable')
+
+    def __init__(self, sa_matrix, scene_time, actors_list, days, actors_to_ignore=()):
+        self.sa_matrix = np.asarray(sa_matrix)
+        self.scene_time = np.asarray(scene_time, dtype=int)
+        self.actors_list = list(actors_list)
+        self.days = list(days)
+        n_actors = self.sa_matrix.shape[1]
+        self.max_minutes = np.array([day.max_hours * 60 for day in self.days], dtype=float)
+        self.min_minutes = np.array([day.min_hours * 60 for day in self.days], dtype=float)
+        self.counted = get_counted_actors(n_actors, actors_to_ignore)
+        # per day, the 1-based actors make_schedule should treat as ignored
+        self.day_ignore = [sorted(set(actors_to_ignore) | set(day.unavailable_actors)) for day in self.days]
+        blocked = np.zeros((len(self.days), n_actors), dtype=bool)
+        for day_ix, ignore in enumerate(self.day_ignore):
+            blocked[day_ix, [a - 1 for a in ignore if 0 < a <= n_actors]] = True
+        self.cast = self.sa_matrix != 0
+        self.feasible = ~(self.cast.astype(int) @ blocked.T.astype(int)).astype(bool)
+        self.unplaceable = np.flatnonzero(~self.feasible.any(axis=1)).tolist()
+
+    def day_costs(self, day_ix, orders):
+        """Energies of candidate scene orders for one day. An empty day only pays its minimum-hours penalty."""
+        day = self.days[day_ix]
+        energies = energy_function_batch(orders, self.sa_matrix, self.scene_time, day.max_hours, day.min_hours,
+                                         self.day_ignore[day_ix], [])
+        empty = np.array([len(order) == 0 for order in orders])
+        return np.where(empty, 1000 * day.min_hours * 60, energies)
+
+    def initial_assignment(self):
+        """Greedy split of the placeable scenes over the days.
+
+        Scenes with the fewest possible days and the longest running time go
+        first, each to the feasible day it fits best: within the hour limit,
+        sharing the most cast with what the day already has, least loaded.
+        """
+        n_days = len(self.days)
+        capacity = self.max_minutes
+        # a day with max_hours=0 still gets a load ratio to compare days by
+        ratio_capacity = np.maximum(capacity, 1)
+        load = np.zeros(n_days)
+        day_cast = np.zeros((n_days, self.cast.shape[1]), dtype=bool)
+        assignment = [[] for _ in range(n_days)]
+        unplaceable = set(self.unplaceable)
+        placeable = [s for s in range(len(self.sa_matrix)) if s not in unplaceable]
+        placeable.sort(key=lambda s: (self.feasible[s].sum(), -self.scene_time[s]))
+        for scene in placeable:
+            days = np.flatnonzero(self.feasible[scene])
+            overflow = np.maximum(load[days] + self.scene_time[scene] - capacity[days], 0)
+            shared = (day_cast[days] & self.cast[scene]).sum(axis=1)
+            best = days[np.lexsort((load[days] / ratio_capacity[days], -shared, overflow))[0]]
+            assignment[best].append(scene)
+            load[best] += self.scene_time[scene]
+            day_cast[best] |= self.cast[scene]
+        return assignment
+
+    def assignment_costs(self, work, load, day_ixs):
+        """Order-free cost of days from the minutes each actor works there and their total minutes.
+
+        These are the energy_function terms that do not depend on the scene
+        order: the time window penalty, 50 per called actor and 500 per actor
+        working under an hour. Wait time is left to the day solves. work is
+        (..., n_actors); load and day_ixs broadcast against work[..., 0].
+        """
+        over = np.maximum(load - self.max_minutes[day_ixs], 0)
+        under = np.maximum(self.min_minutes[day_ixs] - load, 0)
+        called = work > 0
+        short = called & (work < 60) & self.counted
+        return 1000 * (over + under) + 50 * called.sum(axis=-1) + 500 * short.sum(axis=-1)
+
+    def rebalance(self, assignment, rounds=3, rng=None):
+        """Moves and swaps scenes between days while the summed assignment cost drops.
+
+        Each scene in turn is tried on every other day it may go to, and
+        swapped with every scene of those days that may take its place; the
+        best improving change is applied. Candidates are scored together from
+        the per-day actor minutes. Returns the new assignment.
+        """
+        rng = rng or random.Random()
+        assignment = [list(scenes) for scenes in assignment]
+        scene_work = self.cast * self.scene_time[:, None]
+        work = np.array([scene_work[scenes].sum(axis=0) for scenes in assignment])
+        load = np.array([self.scene_time[scenes].sum() for scenes in assignment])
+        day_of = {scene: d for d, scenes in enumerate(assignment) for scene in scenes}
+        costs = self.assignment_costs(work, load, np.arange(len(self.days)))
+        for _ in range(rounds):
+            improved = False
+            order = list(day_of)
+            rng.shuffle(order)
+            for scene in order:
+                src = day_of[scene]
+                dst_days = np.flatnonzero(self.feasible[scene])
+                dst_days = dst_days[dst_days != src]
+                if not len(dst_days):
+                    continue
+                w, minutes = scene_work[scene], self.scene_time[scene]
+                # move to another day
+                src_cost = self.assignment_costs(work[src] - w, load[src] - minutes, src)
+                move_costs = self.assignment_costs(work[dst_days] + w, load[dst_days] + minutes, dst_days)
+                gains = costs[src] + costs[dst_days] - src_cost - move_costs
+                k = int(np.argmax(gains))
+                best_gain, best_dst, partner = gains[k], int(dst_days[k]), None
+                # swap with a scene of another day
+                for dst in dst_days:
+                    partners = [other for other in assignment[dst] if self.feasible[other, src]]
+                    if not partners:
+                        continue
+                    pw, pminutes = scene_work[partners], self.scene_time[partners]
+                    src_costs = self.assignment_costs(work[src] - w + pw, load[src] - minutes + pminutes, src)
+                    dst_costs = self.assignment_costs(work[dst] + w - pw, load[dst] + minutes - pminutes, dst)
+                    gains = costs[src] + costs[dst] - src_costs - dst_costs
+                    k = int(np.argmax(gains))
+                    if gains[k] > best_gain:
+                        best_gain, best_dst, partner = gains[k], int(dst), partners[k]
+                if best_gain <= 0:
+                    continue
+                moved = [(scene, src, best_dst)] + ([(partner, best_dst, src)] if partner is not None else [])
+                for moved_scene, from_day, to_day in moved:
+                    assignment[from_day].remove(moved_scene)
+                    assignment[to_day].append(moved_scene)
+                    work[from_day] -= scene_work[moved_scene]
+                    work[to_day] += scene_work[moved_scene]
+                    load[from_day] -= self.scene_time[moved_scene]
+                    load[to_day] += self.scene_time[moved_scene]
+                    day_of[moved_scene] = to_day
+                pair = np.array([src, best_dst])
+                costs[pair] = self.assignment_costs(work[pair], load[pair], pair)
+                improved = True
+            if not improved:
+                break
+        return assignment
+
+
+def _solve_day(sub_matrix, sub_time, actors_list, max_hours, min_hours, actors_to_ignore, seed, schedule_kwargs):
+    # runs in a worker process: the best order of one day's scenes (all included)
+    n_scenes = len(sub_matrix)
+    state = make_schedule(max_hours, min_hours, sub_matrix, sub_time, actors_list, actors_to_ignore,
+                          list(range(1, n_scenes + 1)), [], seed=seed, **schedule_kwargs)[0]
+    return state
+
+
+def solve_days(problem, orders, day_ixs, n_workers=None, seed=None, schedule_kwargs=None):
+    """Orders the scenes of the given days in parallel on the shared solver pool.
+
+    Each day is a make_schedule run on just its own scenes, all required
+    (solved exactly when small enough). The new order replaces the old one
+    only if it scores better. Returns the updated orders.
+    """
+    schedule_kwargs = dict(schedule_kwargs or {})
+    schedule_kwargs.setdefault('solver', 'auto')
+    orders = [list(order) for order in orders]
+    jobs = [d for d in day_ixs if len(orders[d]) > 1]
+    if not jobs:
+        return orders
+    args = [(problem.sa_matrix[orders[d]], problem.scene_time[orders[d]].tolist(), problem.actors_list,
+             problem.days[d].max_hours, problem.days[d].min_hours, problem.day_ignore[d],
+             None if seed is None else seed + d, schedule_kwargs) for d in jobs]
+    if len(jobs) == 1:
+        states = [_solve_day(*args[0])]
+    else:
+        states = list(get_solver_pool(n_workers).map(_solve_day, *zip(*args)))
+    for d, state in zip(jobs, states):
+        candidate = [orders[d][i] for i in state]
+        if len(candidate) == len(orders[d]):
+            old_cost, new_cost = problem.day_costs(d, [orders[d], candidate])
+            if new_cost < old_cost:
+                orders[d] = candidate
+    return orders
+
+
+def plan_block(days, sa_matrix, scene_time, actors_list, actors_to_ignore=(), n_workers=None, seed=None,
+               rebalance_rounds=3, **schedule_kwargs):
+    """Splits a whole production over a block of rehearsal days.
+
+    days is a list of RehearsalDay. Every scene that can be rehearsed on
+    some day is planned exactly once. The block is compiled once into a
+    BlockProblem and split greedily, then the days are solved in parallel
+    (make_schedule on each day's scenes, extra keyword arguments are passed
+    on). Scenes are then rebalanced between days on the order-free costs,
+    and only the days whose scene sets changed are solved again; the
+    rebalanced days are kept if their summed energy, wait time included,
+    is lower than before.
+
+    Returns a dict with "days" (per day: name, 1-based scene order,
+    energy, call_times, nr_calls, breakdown), "total_energy" and
+    "unplaceable" (1-based scenes no day can take).
+    """
+    problem = BlockProblem(sa_matrix, scene_time, actors_list, days, actors_to_ignore)
+    n_days = len(problem.days)
+    orders = solve_days(problem, problem.initial_assignment(), range(n_days), n_workers, seed, schedule_kwargs)
+
+    # moved scenes are appended to their new day, the other days keep their order
+    rebalanced = problem.rebalance(orders, rebalance_rounds, random.Random(seed))
+    changed = [d for d in range(n_days) if set(rebalanced[d]) != set(orders[d])]
+    if changed:
+        rebalanced = solve_days(problem, rebalanced, changed, n_workers, None if seed is None else seed + n_days,
+                                schedule_kwargs)
+        old_cost = sum(problem.day_costs(d, [orders[d]])[0] for d in changed)
+        new_cost = sum(problem.day_costs(d, [rebalanced[d]])[0] for d in changed)
+        if new_cost < old_cost:
+            orders = rebalanced
+
+    planned = []
+    for d, order in enumerate(orders):
+        day = problem.days[d]
+        if order:
+            energy, call_times, nr_calls, breakdown = energy_function(
+                order, problem.sa_matrix, problem.scene_time, day.max_hours, day.min_hours,
+                problem.day_ignore[d], problem.actors_list, [])
+        else:
+            energy, call_times, nr_calls = float(problem.day_costs(d, [order])[0]), {}, []
+            breakdown = {"Total Time (min)": 0, "Time Constraint Penalty": energy}
+        planned.append({
+            "name": day.name,
+            "scenes": [s + 1 for s in order],
+            "energy": energy,
+            "call_times": call_times,
+            "nr_calls": nr_calls,
+            "breakdown": breakdown,
+        })
+    return {
+        "days": planned,
+        "total_energy": sum(day["energy"] for day in planned),
+        "unplaceable": [s + 1 for s in problem.unplaceable],
+    }
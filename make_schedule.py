@@ -1,8 +1,16 @@
-import pandas as pd
 from math import log
 from math import exp
-from random import random
-from random import randint
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+import csv
+import functools
+import hashlib
+import html
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
 import time
 import numpy as np
 
@@ -19,34 +27,137 @@ def update_t(step, t_min, t_max, step_max):
     return new_t
 
 
-# This function is correct.
+# --- Cooling schedules ---
+class LinearCooling:
+    """Linear cooling from t_max to t_min (update_t)."""
+
+    def __init__(self, t_min, t_max, step_max):
+        self.t_min = t_min
+        self.t_max = t_max
+        self.step_max = step_max
+
+    def temperature(self, step):
+        return update_t(step, self.t_min, self.t_max, self.step_max)
+
+    def record(self, accepted):
+        # called after every Metropolis test; only adaptive cooling uses it
+        pass
+
+
+class GeometricCooling(LinearCooling):
+    """t_max * ratio**step, reaching t_min (or t_max / 1000 if t_min <= 0) at step_max."""
+
+    def temperature(self, step):
+        t_end = self.t_min if self.t_min > 0 else self.t_max / 1000
+        return self.t_max * (t_end / self.t_max) ** (step / self.step_max)
+
+
+class AdaptiveCooling(LinearCooling):
+    """Steers the temperature so the acceptance rate follows a target curve.
+
+    The target decays geometrically from accept_start to accept_end over the
+    run. Every `window` steps the temperature is scaled down if moves were
+    accepted more often than targeted, and up if less often.
+    """
+
+    window = 100
+
+    def __init__(self, t_min, t_max, step_max, accept_start=0.5, accept_end=0.005):
+        super().__init__(t_min, t_max, step_max)
+        self.accept_start = accept_start
+        self.accept_end = accept_end
+        self.t = t_max
+        self.n_seen = 0
+        self.n_accepted = 0
+
+    def temperature(self, step):
+        if self.n_seen >= self.window:
+            target = self.accept_start * (self.accept_end / self.accept_start) ** (step / self.step_max)
+            rate = self.n_accepted / self.n_seen
+            self.t *= 0.9 if rate > target else 1 / 0.9
+            self.t = max(self.t, self.t_min, 1e-9)
+            self.n_seen = 0
+            self.n_accepted = 0
+        return self.t
+
+    def record(self, accepted):
+        self.n_seen += 1
+        self.n_accepted += accepted
+
+
+COOLING_SCHEDULES = {
+    'linear': LinearCooling,
+    'geometric': GeometricCooling,
+    'adaptive': AdaptiveCooling,
+}
+
+
+def calibrate_temperature(evaluator, propose, n_samples=200, initial_acceptance=0.8, commit=None):
+    # Starting temperature at which a typical uphill move is accepted with
+    # probability initial_acceptance, from the median uphill delta seen on a
+    # short random walk. Hard constraint moves (1,000,000 and up) are left
+    # out so they do not swamp the estimate. The evaluator is walked, so pass
+    # a throwaway one; commit(state, move), if given, is called before each
+    # step of the walk (e.g. MoveGenerator.commit).
+    if not 0 < initial_acceptance < 1:
+        raise ValueError(f"initial_acceptance must be between 0 and 1 (exclusive), got {initial_acceptance}")
+    uphill = []
+    for _ in range(n_samples):
+        move = propose(evaluator.state)
+        delta = evaluator.move_energy(move) - evaluator.energy
+        if 0 < delta < 1000000:
+            uphill.append(delta)
+        if commit is not None:
+            commit(evaluator.state, move)
+        evaluator.commit(move)
+    if not uphill:
+        return None
+    return float(-np.median(uphill) / log(initial_acceptance))
+
+
+def get_actor_spans(state_matrix, durations):
+    # first/last position, span time and work time of every actor in one pass.
+    # state_matrix holds the sa_matrix rows in state order, durations the
+    # matching scene times. Actors that are not called get -1 and 0.
+    present = state_matrix == 1
+    n_positions, n_actors = present.shape
+    if not n_positions:
+        no_call = np.full(n_actors, -1)
+        return no_call, no_call.copy(), np.zeros(n_actors, dtype=int), np.zeros(n_actors, dtype=int)
+
+    called = present.any(axis=0)
+    cum_time = np.concatenate(([0], np.cumsum(durations)))
+    first_pos = np.where(called, present.argmax(axis=0), -1)
+    last_pos = np.where(called, n_positions - 1 - present[::-1].argmax(axis=0), -1)
+    span_time = np.where(called, cum_time[last_pos + 1] - cum_time[first_pos], 0)
+    work_time = durations @ present
+    return first_pos, last_pos, span_time, work_time
+
+
+def get_counted_actors(n_actors, actors_to_ignore):
+    # mask of actors that count towards wait time and short work (1-based ignore list)
+    return np.array([(actor_ix + 1) not in actors_to_ignore for actor_ix in range(n_actors)], dtype=bool)
+
+
 def get_actor_call_times(state, name_list, scene_time, sa_matrix):
-    # get what the first scene is when people need to attend
-    n_actors = len(name_list)
+    # get what the first scene is when people need to attend.
+    # An actor is called at the first scene of the state they appear in,
+    # found for all actors at once with argmax over the state matrix.
     nr_calls = [0]*len(state)
-    actor_call_time = [None]*n_actors
-    
-    # Loop over all actors
-    for actor_ix, actor in enumerate(sa_matrix.T):
-        actor_id = actor_ix + 1
-        
-        attend = actor[state]
-        for i in range(1, len(attend)+1):
-            call_slice = attend[0:i]
-            call_test = (i-1)*[0]+[1]
+    call_time_dict = {}
+    if not state:
+        return call_time_dict, nr_calls
 
-            if (call_slice == call_test).all():
-                actor_call_time[actor_ix] = i
-                nr_calls[i-1] += 1
+    state_matrix = sa_matrix[state, :]
+    first_entry = (state_matrix != 0).argmax(axis=0)
+    called = state_matrix[first_entry, np.arange(state_matrix.shape[1])] == 1
+    
+    nr_calls = np.bincount(first_entry[called], minlength=len(state)).tolist()
 
     # get info in nice dict form
-    call_time_dict = {}
-
-    temp = np.array(scene_time)
-    len_state_scenes = list(temp[state])
-    for ix, call_scene in enumerate(actor_call_time):
-        if call_scene:
-            call_time_dict[name_list[ix]] = sum(len_state_scenes[0:call_scene-1])
+    cum_time = np.concatenate(([0], np.cumsum(np.array(scene_time)[state])))
+    for actor_ix in np.flatnonzero(called):
+        call_time_dict[name_list[actor_ix]] = cum_time[first_entry[actor_ix]]
 
     return call_time_dict, nr_calls
 
@@ -65,7 +176,7 @@ def energy_function(state, sa_matrix, scene_time, max_hours, min_hours, actors_t
             actors_to_ignore_0idx = [a - 1 for a in actors_to_ignore]
             state_matrix = sa_matrix[state, :]
             state_ignored_actor_matrix = state_matrix[:, actors_to_ignore_0idx]
-            violations = np.sum(state_ignored_actor_matrix)
+            violations = int(np.sum(state_ignored_actor_matrix))
             actor_hard_constraint_penalty = violations * 1000000 
         except IndexError:
             actor_hard_constraint_penalty = 1000000 
@@ -104,36 +215,14 @@ def energy_function(state, sa_matrix, scene_time, max_hours, min_hours, actors_t
         base_energy = 999999 + time_constraint_penalty + actor_hard_constraint_penalty + avoided_scene_penalty
         return base_energy, {}, [0], energy_breakdown
 
-    # --- 1. Corrected Wait Time Logic & Short Work Penalty (Unchanged) ---
-    total_wait_time = 0
-    short_work_penalty = 0 
+    # --- 1. Wait Time & Short Work Penalty (vectorized over all actors) ---
     n_actors = sa_matrix.shape[1] 
     state_matrix = sa_matrix[state, :]
+    first_pos, last_pos, actor_span_min, actor_work_min = get_actor_spans(state_matrix, temp[state])
     
-    for actor_ix in range(n_actors):
-        if (actor_ix + 1) in actors_to_ignore:
-             continue
-             
-        actor_schedule_in_state = state_matrix[:, actor_ix]
-        scenes_present_indices = np.where(actor_schedule_in_state == 1)[0]
-        
-        if len(scenes_present_indices) == 0:
-            continue
-            
-        first_scene_pos = scenes_present_indices[0]
-        last_scene_pos = scenes_present_indices[-1]
-        
-        actor_schedule_slice_durations = len_state_scenes[first_scene_pos : last_scene_pos + 1]
-        actor_schedule_in_state_slice = actor_schedule_in_state[first_scene_pos : last_scene_pos + 1]
-        
-        total_actor_time_min = sum(actor_schedule_slice_durations)
-        actor_work_time_min = sum(np.array(actor_schedule_slice_durations) * actor_schedule_in_state_slice)
-        
-        wait_time = total_actor_time_min - actor_work_time_min
-        total_wait_time += wait_time
-        
-        if actor_work_time_min > 0 and actor_work_time_min < 60:
-            short_work_penalty += 500 
+    counted = get_counted_actors(n_actors, actors_to_ignore)
+    total_wait_time = (actor_span_min - actor_work_min)[counted].sum()
+    short_work_penalty = np.count_nonzero(counted & (actor_work_min > 0) & (actor_work_min < 60)) * 500
         
     # --- 2. Call Time / Nr_Calls Calculation (Unchanged) ---
     call_times, nr_calls = get_actor_call_times(state, name_list, scene_time, sa_matrix)
@@ -158,21 +247,452 @@ def energy_function(state, sa_matrix, scene_time, max_hours, min_hours, actors_t
     return total_energy, call_times, nr_calls, energy_breakdown
 
 
+def get_scene_ignore_hits(sa_matrix, actors_to_ignore):
+    # ignored-actor appearances per scene, with the same semantics as the
+    # hard constraint check in energy_function (an invalid index is a flat penalty)
+    ignore_weights = np.zeros(sa_matrix.shape[1], dtype=int)
+    ignore_error = False
+    if actors_to_ignore:
+        try:
+            np.add.at(ignore_weights, [a - 1 for a in actors_to_ignore], 1)
+        except IndexError:
+            ignore_error = True
+    return sa_matrix @ ignore_weights, ignore_error
+
+
+def get_avoided_scene_mask(n_scenes, scenes_to_avoid_0idx):
+    scene_avoided = np.zeros(n_scenes, dtype=bool)
+    for scene in scenes_to_avoid_0idx:
+        if 0 <= scene < n_scenes:
+            scene_avoided[scene] = True
+    return scene_avoided
+
+
+def energy_function_batch(states, sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore, scenes_to_avoid_0idx):
+    # Score K candidate states at once; returns an array of K energies equal
+    # to what energy_function gives for each state. `states` is either a list
+    # of states or a (K, L) int array padded with -1. Everything is computed
+    # on one (candidates x positions x actors) presence tensor.
+    if isinstance(states, np.ndarray):
+        padded = states
+    else:
+        max_len = max((len(s) for s in states), default=0)
+        padded = np.full((len(states), max_len), -1, dtype=int)
+        for k, state in enumerate(states):
+            padded[k, :len(state)] = state
+    mask = padded >= 0
+    scene_ix = np.where(mask, padded, 0)
+
+    n_scenes, n_actors = sa_matrix.shape
+    n_candidates, n_positions = padded.shape
+    durations = np.where(mask, np.array(scene_time)[scene_ix], 0)
+    total_time = durations.sum(axis=1)
+    n_positions_used = mask.sum(axis=1)
+
+    # --- Constraint penalties ---
+    scene_ignore_hits, ignore_error = get_scene_ignore_hits(sa_matrix, actors_to_ignore)
+    if ignore_error:
+        actor_hard_constraint_penalty = np.full(n_candidates, 1000000)
+    else:
+        actor_hard_constraint_penalty = np.where(mask, scene_ignore_hits[scene_ix], 0).sum(axis=1) * 1000000
+    scene_avoided = get_avoided_scene_mask(n_scenes, scenes_to_avoid_0idx)
+    avoided_scene_penalty = (mask & scene_avoided[scene_ix]).sum(axis=1) * 1000000
+
+    max_time = max_hours*60
+    min_time = min_hours*60
+    time_constraint_penalty = np.where(total_time > max_time, 1000 * (total_time - max_time), 0)
+    time_constraint_penalty = np.where(total_time < min_time, 1000 * (min_time - total_time), time_constraint_penalty)
+
+    # --- Wait time, calls and short work over the 3D tensor ---
+    present = (sa_matrix == 1)[scene_ix] & mask[:, :, None]
+    called = present.any(axis=1)
+    if n_positions:
+        cum_time = np.concatenate((np.zeros((n_candidates, 1), dtype=durations.dtype), durations.cumsum(axis=1)), axis=1)
+        first_pos = present.argmax(axis=1)
+        last_pos = n_positions - 1 - present[:, ::-1].argmax(axis=1)
+        span_time = np.where(called, np.take_along_axis(cum_time, last_pos + 1, axis=1)
+                             - np.take_along_axis(cum_time, first_pos, axis=1), 0)
+        work_time = np.einsum('kp,kpa->ka', durations, present)
+    else:
+        span_time = work_time = np.zeros((n_candidates, n_actors), dtype=int)
+
+    counted = get_counted_actors(n_actors, actors_to_ignore)
+    total_wait_time = ((span_time - work_time) * counted).sum(axis=1)
+    short_work_penalty = (counted & (work_time > 0) & (work_time < 60)).sum(axis=1) * 500
+    call_penalty = called.sum(axis=1) * 50
+
+    total_energy = (total_wait_time + call_penalty + time_constraint_penalty +
+                    actor_hard_constraint_penalty + avoided_scene_penalty + short_work_penalty)
+    empty_energy = 999999 + time_constraint_penalty + actor_hard_constraint_penalty + avoided_scene_penalty
+    return np.where(n_positions_used > 0, total_energy, empty_energy)
+
+
+# --- Bit packing helpers (exact solver and lower bound) ---
+def pack_bits(bool_array):
+    # pack the last axis of a bool array into little-endian uint64 words
+    n_bits = bool_array.shape[-1]
+    n_words = max(1, -(-n_bits // 64))
+    padded = np.zeros(bool_array.shape[:-1] + (n_words * 64,), dtype=bool)
+    padded[..., :n_bits] = bool_array
+    return np.packbits(padded, axis=-1, bitorder='little').view('<u8')
+
+
+def popcount(words):
+    # number of set bits per uint64 word
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words)
+    bits = np.unpackbits(np.ascontiguousarray(words).view(np.uint8), axis=-1)
+    return bits.reshape(words.shape + (64,)).sum(axis=-1)
+
+
+def mask_to_indices(mask, n_bits):
+    # set bit positions of a Python int bitmask, ascending
+    raw = np.frombuffer(mask.to_bytes((n_bits + 7) // 8 or 1, 'little'), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder='little')[:n_bits])
+
+
+class EnergyCache:
+    """Bounded LRU cache of energies for revisited states.
+
+    Keys are 16-byte digests of the state together with a problem key
+    (matrix, scene times and constraint parameters, see problem_key), so
+    one cache can be shared between solves of different problems. The
+    least recently used entry is evicted once maxsize entries are held.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def problem_key(sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore, scenes_to_avoid_0idx):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.ascontiguousarray(sa_matrix).tobytes())
+        digest.update(repr((sa_matrix.shape, list(scene_time), max_hours, min_hours,
+                            sorted(actors_to_ignore), sorted(scenes_to_avoid_0idx))).encode())
+        return digest.digest()
+
+    def key(self, state, problem_key):
+        return hashlib.blake2b(problem_key + np.array(state, dtype=np.int32).tobytes(), digest_size=16).digest()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class IncrementalEnergy:
+    """Scores moves against a current state.
+
+    Keeps per-actor first/last position, work time and span time for the
+    current state, so an add, remove or swap only touches the actors in the
+    affected scenes instead of re-running energy_function. Replace, block
+    and reverse moves are scored with one vectorized pass over the new
+    state. Gives the same energy as energy_function for every state.
+    """
+
+    def __init__(self, state, sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore, scenes_to_avoid_0idx):
+        n_scenes, n_actors = sa_matrix.shape
+        self.sa_present = sa_matrix == 1
+        self.scene_cast = [np.flatnonzero(row) for row in self.sa_present]
+        self.scene_time = np.array(scene_time)
+        self.max_time = max_hours*60
+        self.min_time = min_hours*60
+
+        # Ignored actors do not count towards wait time or short work
+        self.active = get_counted_actors(n_actors, actors_to_ignore)
+
+        self.scene_ignore_hits, self.ignore_error = get_scene_ignore_hits(sa_matrix, actors_to_ignore)
+        self.scene_avoided = get_avoided_scene_mask(n_scenes, scenes_to_avoid_0idx)
+
+        self.state = list(state)
+        self._rebuild()
+
+    def _rebuild(self):
+        # recompute all per-actor data for self.state in one vectorized pass
+        n = len(self.state)
+        self.present = self.sa_present[self.state]
+        self.durations = self.scene_time[self.state]
+        self.cum = np.concatenate(([0], np.cumsum(self.durations)))
+        self.count = self.present.sum(axis=0)
+        called = self.count > 0
+        self.first, self.last, self.span, self.work = get_actor_spans(self.present, self.durations)
+
+        # cover[k]: active actors that would wait through a scene inserted at position k
+        counted = self.active & called
+        self.cover = (np.bincount(self.first[counted] + 1, minlength=n + 2)
+                      - np.bincount(self.last[counted] + 1, minlength=n + 2)).cumsum()[:n + 1]
+
+        self.total_time = self.cum[-1]
+        self.wait_time = (self.span - self.work)[self.active].sum()
+        self.n_called = np.count_nonzero(called)
+        self.n_short = np.count_nonzero(self.active & (self.work > 0) & (self.work < 60))
+        self.ignore_hits = self.scene_ignore_hits[self.state].sum()
+        self.n_avoided = np.count_nonzero(self.scene_avoided[self.state])
+        self.energy = self._energy(n, self.total_time, self.wait_time, self.n_called, self.n_short,
+                                   self.ignore_hits, self.n_avoided)
+
+    def _energy(self, n_positions, total_time, wait_time, n_called, n_short, ignore_hits, n_avoided):
+        time_constraint_penalty = 0
+        if total_time > self.max_time:
+            time_constraint_penalty = 1000 * (total_time - self.max_time)
+        if total_time < self.min_time:
+            time_constraint_penalty = 1000 * (self.min_time - total_time)
+
+        actor_hard_constraint_penalty = 1000000 if self.ignore_error else ignore_hits * 1000000
+        avoided_scene_penalty = n_avoided * 1000000
+
+        if not n_positions:
+            return 999999 + time_constraint_penalty + actor_hard_constraint_penalty + avoided_scene_penalty
+        return (wait_time + n_called * 50 + time_constraint_penalty +
+                actor_hard_constraint_penalty + avoided_scene_penalty + n_short * 500)
+
+    def _next_present(self, actor, pos):
+        # first position after pos where the actor is on stage, or -1
+        col = self.present[pos + 1:, actor]
+        return pos + 1 + col.argmax() if col.any() else -1
+
+    def _prev_present(self, actor, pos):
+        # last position before pos where the actor is on stage, or -1
+        col = self.present[:pos, actor]
+        return pos - 1 - col[::-1].argmax() if col.any() else -1
+
+    def move_energy(self, move):
+        """Energy of the state that `move` would produce, without applying it."""
+        if move is None:
+            return self.energy
+        if move[0] == 'add':
+            return self._add_energy(move[1], move[2])
+        if move[0] == 'remove':
+            return self._remove_energy(move[1])
+        if move[0] == 'swap':
+            return self._swap_energy(move[1], move[2])
+        if move[0] == 'replace':
+            return self._state_energy(apply_move(self.state, move))
+        return self._reorder_energy(apply_move(self.state, move))
+
+    def commit(self, move):
+        """Apply `move` to the current state."""
+        if move is None:
+            return
+        self.state = apply_move(self.state, move)
+        self._rebuild()
+
+    def _state_energy(self, state):
+        # energy of any state in one vectorized pass (same terms as _rebuild)
+        present = self.sa_present[state]
+        durations = self.scene_time[state]
+        _, _, span, work = get_actor_spans(present, durations)
+        called = present.any(axis=0)
+        return self._energy(len(state), durations.sum(), (span - work)[self.active].sum(), np.count_nonzero(called),
+                            np.count_nonzero(self.active & (work > 0) & (work < 60)),
+                            self.scene_ignore_hits[state].sum(), np.count_nonzero(self.scene_avoided[state]))
+
+    def _reorder_energy(self, state):
+        # same scenes in a new order: only the wait time changes
+        present = self.sa_present[state]
+        _, _, span, _ = get_actor_spans(present, self.scene_time[state])
+        wait_time = (span - self.work)[self.active].sum()
+        return self._energy(len(state), self.total_time, wait_time, self.n_called, self.n_short,
+                            self.ignore_hits, self.n_avoided)
+
+    def _add_energy(self, pos, scene):
+        d = self.scene_time[scene]
+        # every active actor spanning the insert point now waits through the scene
+        wait_time = self.wait_time + d * self.cover[pos]
+        n_called = self.n_called
+        n_short = self.n_short
+
+        for a in self.scene_cast[scene]:
+            if self.count[a] == 0:
+                n_called += 1
+                if self.active[a] and 0 < d < 60:
+                    n_short += 1
+                continue
+            if not self.active[a]:
+                continue
+
+            first, last, work, span = self.first[a], self.last[a], self.work[a], self.span[a]
+            if pos <= first:
+                new_span = self.cum[last + 1] - self.cum[pos] + d
+            elif pos > last:
+                new_span = self.cum[pos] - self.cum[first] + d
+            else:
+                # counted in cover, but works the scene instead of waiting
+                new_span = span + d
+                wait_time -= d
+            wait_time += (new_span - work - d) - (span - work)
+            n_short += int(0 < work + d < 60) - int(0 < work < 60)
+
+        return self._energy(len(self.state) + 1, self.total_time + d, wait_time, n_called, n_short,
+                            self.ignore_hits + self.scene_ignore_hits[scene],
+                            self.n_avoided + int(self.scene_avoided[scene]))
+
+    def _remove_energy(self, pos):
+        scene = self.state[pos]
+        d = self.scene_time[scene]
+        # every active actor spanning the removed scene no longer waits through it
+        wait_time = self.wait_time - d * self.cover[pos]
+        n_called = self.n_called
+        n_short = self.n_short
+
+        for a in self.scene_cast[scene]:
+            work = self.work[a]
+            if self.count[a] == 1:
+                n_called -= 1
+                if self.active[a]:
+                    n_short -= int(0 < work < 60)
+                continue
+            if not self.active[a]:
+                continue
+
+            first, last, span = self.first[a], self.last[a], self.span[a]
+            if first < pos:
+                # counted in cover, but was working the scene instead of waiting
+                wait_time += d
+            new_first = first if first != pos else self._next_present(a, pos)
+            new_last = last if last != pos else self._prev_present(a, pos)
+            new_span = self.cum[new_last + 1] - self.cum[new_first]
+            if new_first < pos < new_last:
+                new_span -= d
+            wait_time += (new_span - (work - d)) - (span - work)
+            n_short += int(0 < work - d < 60) - int(0 < work < 60)
+
+        return self._energy(len(self.state) - 1, self.total_time - d, wait_time, n_called, n_short,
+                            self.ignore_hits - self.scene_ignore_hits[scene],
+                            self.n_avoided - int(self.scene_avoided[scene]))
+
+    def _swap_energy(self, idx1, idx2):
+        i, j = min(idx1, idx2), max(idx1, idx2)
+        if i == j:
+            return self.energy
+        scene_i, scene_j = self.state[i], self.state[j]
+        shift = self.scene_time[scene_j] - self.scene_time[scene_i]
+        cast_i, cast_j = self.scene_cast[scene_i], self.scene_cast[scene_j]
+        wait_time = self.wait_time
+
+        # Actors in neither scene keep their first/last position; their span
+        # only changes if it holds exactly one of the two swapped positions.
+        if shift:
+            counted = self.active & (self.count > 0)
+            holds_i = counted & (self.first < i) & (self.last > i) & (self.last < j)
+            holds_j = counted & (self.first > i) & (self.first < j) & (self.last > j)
+            holds_i[cast_i] = holds_i[cast_j] = False
+            holds_j[cast_i] = holds_j[cast_j] = False
+            wait_time += shift * (np.count_nonzero(holds_i) - np.count_nonzero(holds_j))
+
+        def new_cum(k):
+            return self.cum[k] + shift if i < k <= j else self.cum[k]
+
+        in_j = self.sa_present[scene_j]
+        in_i = self.sa_present[scene_i]
+        for a, old_pos, new_pos in ([(a, i, j) for a in cast_i if not in_j[a]] +
+                                    [(a, j, i) for a in cast_j if not in_i[a]]):
+            if not self.active[a]:
+                continue
+            first, last = self.first[a], self.last[a]
+            if first == old_pos:
+                first = self._next_present(a, old_pos)
+            if last == old_pos:
+                last = self._prev_present(a, old_pos)
+            first = new_pos if first == -1 else min(first, new_pos)
+            last = new_pos if last == -1 else max(last, new_pos)
+            wait_time += (new_cum(last + 1) - new_cum(first)) - self.span[a]
+
+        return self._energy(len(self.state), self.total_time, wait_time, self.n_called, self.n_short,
+                            self.ignore_hits, self.n_avoided)
+
+
+class SolverRandom:
+    """Random numbers for one solver run, from a seeded numpy Generator.
+
+    Uniforms are drawn in batches of buffer_size and handed out one at a
+    time, so move decisions, indices and acceptance tests cost a list step
+    instead of a numpy call each. Two runs with the same seed draw the same
+    numbers; separate instances share no state, so runs can go in parallel.
+    """
+
+    __slots__ = ('generator', 'buffer_size', '_next')
+
+    def __init__(self, seed=None, buffer_size=4096):
+        self.generator = np.random.default_rng(seed)
+        self.buffer_size = buffer_size
+        self._refill()
+
+    def _refill(self):
+        self._next = iter(self.generator.random(self.buffer_size).tolist()).__next__
+
+    def random(self):
+        # uniform float in [0, 1)
+        try:
+            return self._next()
+        except StopIteration:
+            self._refill()
+            return self._next()
+
+    def randint(self, a, b):
+        # integer in [a, b], both ends included, like random.randint
+        return a + int(self.random() * (b - a + 1))
+
+    def pair(self, n):
+        # two different indices below n
+        i = self.randint(0, n - 1)
+        j = self.randint(0, n - 2)
+        return i, (j + 1 if j >= i else j)
+
+
+# used by propose_move, get_neighbour and MoveGenerator when no rng is passed
+_default_random = SolverRandom()
+
+
 # --- THIS FUNCTION CONTAINS THE INDEXING FIX ---
-def get_neighbour(state, scenes_to_avoid_0idx, scenes_to_include_0idx, sa_matrix):
-    # get a random neighbour state
-    # by adding, removing or swapping a scene
+def propose_move(state, scenes_to_avoid_0idx, scenes_to_include_0idx, sa_matrix, rng=None):
+    # pick a random neighbour move without building the new state:
+    # ('add', pos, scene), ('remove', pos), ('swap', idx1, idx2) or None
+    # rng is a SolverRandom; pass the run's own one for reproducible moves.
     
     n_scenes = len(sa_matrix)
-    new_state = state[:]
+    rng = rng or _default_random
+    random, randint = rng.random, rng.randint
     
     # 50% chance to add/remove, 50% chance to swap
-    if random() < 0.5 or len(new_state) < 2:
+    if random() < 0.5 or len(state) < 2:
         # add or remove
         add = True
-        if not new_state: # if empty, must add
+        if not state: # if empty, must add
             add = True
-        elif len(new_state) >= n_scenes: # if full, must remove
+        elif len(state) >= n_scenes: # if full, must remove
             add = False
         elif random() < 0.5: # 50/50
             add = False
@@ -180,22 +700,20 @@ def get_neighbour(state, scenes_to_avoid_0idx, scenes_to_include_0idx, sa_matrix
         if add:
             # Add a scene
             # --- FIX: Use 0-indexed scenes_to_avoid_0idx ---
-            possible_scenes = list(set(range(n_scenes)) - set(new_state) - set(scenes_to_avoid_0idx))
+            possible_scenes = sorted(set(range(n_scenes)) - set(state) - set(scenes_to_avoid_0idx))
             if not possible_scenes:
-                return new_state # No scenes left to add
+                return None # No scenes left to add
             
             scene_to_add = possible_scenes[randint(0, len(possible_scenes) - 1)]
             
-            if new_state:
-                insert_pos = randint(0, len(new_state))
-                new_state.insert(insert_pos, scene_to_add)
-            else:
-                new_state.append(scene_to_add)
+            if state:
+                return ('add', randint(0, len(state)), scene_to_add)
+            return ('add', 0, scene_to_add)
         else:
             # Remove a scene
             # Do not remove scenes that are in the "must include" list
             possible_removals = []
-            for ix, scene in enumerate(new_state):
+            for ix, scene in enumerate(state):
                 # --- FIX: Use 0-indexed scenes_to_include_0idx ---
                 # scene is 0-indexed, check against 0-indexed list
                 if scene not in scenes_to_include_0idx:
@@ -203,111 +721,1028 @@ def get_neighbour(state, scenes_to_avoid_0idx, scenes_to_include_0idx, sa_matrix
             
             if not possible_removals:
                 # This can happen if state is only "must_include" scenes
-                if len(new_state) > 1:
-                    idx1, idx2 = np.random.choice(len(new_state), 2, replace=False)
-                    new_state[idx1], new_state[idx2] = new_state[idx2], new_state[idx1]
-                return new_state # Return (potentially swapped) state
+                if len(state) > 1:
+                    idx1, idx2 = rng.pair(len(state))
+                    return ('swap', idx1, idx2)
+                return None
                 
-            remove_pos = possible_removals[randint(0, len(possible_removals) - 1)]
-            new_state.pop(remove_pos)
+            return ('remove', possible_removals[randint(0, len(possible_removals) - 1)])
             
     else:
         # swap
-        if len(new_state) > 1:
-            idx1, idx2 = np.random.choice(len(new_state), 2, replace=False)
-            new_state[idx1], new_state[idx2] = new_state[idx2], new_state[idx1]
+        if len(state) > 1:
+            idx1, idx2 = rng.pair(len(state))
+            return ('swap', idx1, idx2)
 
+    return None
+
+
+def apply_move(state, move):
+    # return a new state with the move from propose_move or MoveGenerator applied:
+    # ('replace', pos, scene) puts scene in place of state[pos],
+    # ('block', start, length, dest) moves state[start:start + length] so it starts at dest,
+    # ('reverse', i, j) reverses state[i:j + 1]
+    new_state = state[:]
+    if move is None:
+        return new_state
+    if move[0] == 'add':
+        new_state.insert(move[1], move[2])
+    elif move[0] == 'remove':
+        new_state.pop(move[1])
+    elif move[0] == 'swap':
+        idx1, idx2 = move[1], move[2]
+        new_state[idx1], new_state[idx2] = new_state[idx2], new_state[idx1]
+    elif move[0] == 'replace':
+        new_state[move[1]] = move[2]
+    elif move[0] == 'block':
+        start, length, dest = move[1], move[2], move[3]
+        block = new_state[start:start + length]
+        del new_state[start:start + length]
+        new_state[dest:dest] = block
+    elif move[0] == 'reverse':
+        i, j = move[1], move[2]
+        new_state[i:j + 1] = new_state[i:j + 1][::-1]
     return new_state
 
 
-def load_data(path_to_csv):
-    """Loads all data from the CSV."""
+def get_neighbour(state, scenes_to_avoid_0idx, scenes_to_include_0idx, sa_matrix, rng=None):
+    # get a random neighbour state
+    # by adding, removing or swapping a scene (rng: a SolverRandom)
+    move = propose_move(state, scenes_to_avoid_0idx, scenes_to_include_0idx, sa_matrix, rng)
+    return apply_move(state, move)
+
+
+class ScenePool:
+    """Set of scene numbers with O(1) add, discard and uniform random pick.
+
+    Scenes sit densely in `items`; `index[scene]` is their slot there, or -1.
+    """
+
+    __slots__ = ('items', 'index')
+
+    def __init__(self, n_scenes, scenes=()):
+        self.items = []
+        self.index = [-1] * n_scenes
+        for scene in scenes:
+            self.add(scene)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, scene):
+        return self.index[scene] >= 0
+
+    def add(self, scene):
+        if self.index[scene] < 0:
+            self.index[scene] = len(self.items)
+            self.items.append(scene)
+
+    def discard(self, scene):
+        slot = self.index[scene]
+        if slot < 0:
+            return
+        last = self.items.pop()
+        if last != scene:
+            self.items[slot] = last
+            self.index[last] = slot
+        self.index[scene] = -1
+
+    def pick(self, rng):
+        return self.items[rng.randint(0, len(self.items) - 1)]
+
+
+class OperatorSelector:
+    """Adaptive choice between move operators from their recent success.
+
+    Each operator keeps a running average of its reward (1 for an improving
+    move, 0.25 for an accepted uphill move, 0 otherwise; moves that leave
+    the energy unchanged earn nothing) and is picked with probability
+    proportional to it, with `floor` of the probability spread evenly so no
+    operator dies out.
+    """
+
+    def __init__(self, operators, floor=0.1, decay=0.02, rng=None):
+        self.operators = list(operators)
+        self.rng = rng or _default_random
+        self.floor = floor
+        self.decay = decay
+        self.scores = [1.0] * len(self.operators)
+
+    def choose(self):
+        total = sum(self.scores)
+        r = self.rng.random()
+        if total <= 0 or r < self.floor:
+            return self.rng.randint(0, len(self.operators) - 1)
+        r = (r - self.floor) / (1 - self.floor) * total
+        for ix, score in enumerate(self.scores):
+            r -= score
+            if r < 0:
+                return ix
+        return len(self.operators) - 1
+
+    def record(self, ix, delta_e, accepted):
+        reward = 1.0 if delta_e < 0 else (0.25 if accepted and delta_e > 0 else 0.0)
+        self.scores[ix] += self.decay * (reward - self.scores[ix])
+
+
+class MoveGenerator:
+    """Neighbour moves from indexed scene pools, with adaptive operator choice.
+
+    `addable` holds the scenes that are neither selected nor avoided and
+    `removable` the selected scenes that are not required, so add, remove
+    and replace moves pick in O(1) instead of rebuilding sets per step.
+    Besides add/remove/swap it proposes replace (a selected scene for an
+    unselected one, in place), block (move a run of up to max_block scenes)
+    and reverse (flip a segment). Call commit(state, move) before applying
+    an accepted move so the pools follow the state, and record() with the
+    outcome so the OperatorSelector can adapt. All draws come from rng (a
+    SolverRandom).
+    """
+
+    OPERATORS = ('add', 'remove', 'swap', 'replace', 'block', 'reverse')
+
+    def __init__(self, state, n_scenes, scenes_to_avoid_0idx, scenes_to_include_0idx, max_block=4, adaptive=True,
+                 rng=None):
+        self.rng = rng = rng or _default_random
+        avoided = set(s for s in scenes_to_avoid_0idx if 0 <= s < n_scenes)
+        self.included = set(s for s in scenes_to_include_0idx if 0 <= s < n_scenes)
+        self.addable = ScenePool(n_scenes, (s for s in range(n_scenes) if s not in avoided and s not in state))
+        self.removable = ScenePool(n_scenes, (s for s in state if s not in self.included))
+        self.max_block = max_block
+        self.selector = OperatorSelector(self.OPERATORS, rng=rng) if adaptive else None
+        self.last_operator = None
+
+    def propose(self, state):
+        """A move for `state`, or None if no operator applies."""
+        for _ in range(len(self.OPERATORS)):
+            if self.selector is not None:
+                self.last_operator = self.selector.choose()
+            else:
+                self.last_operator = self.rng.randint(0, len(self.OPERATORS) - 1)
+            move = self._propose(self.OPERATORS[self.last_operator], state)
+            if move is not None:
+                return move
+        return None
+
+    def _propose(self, operator, state):
+        n = len(state)
+        randint = self.rng.randint
+        if operator == 'add':
+            if not self.addable:
+                return None
+            return ('add', randint(0, n), self.addable.pick(self.rng))
+        if operator == 'remove':
+            if not self.removable:
+                return None
+            return ('remove', state.index(self.removable.pick(self.rng)))
+        if operator == 'replace':
+            if not self.addable or not self.removable:
+                return None
+            return ('replace', state.index(self.removable.pick(self.rng)), self.addable.pick(self.rng))
+        if n < 2:
+            return None
+        if operator == 'swap':
+            i, j = self.rng.pair(n)
+            return ('swap', i, j)
+        if operator == 'reverse':
+            i = randint(0, n - 2)
+            return ('reverse', i, randint(i + 1, n - 1))
+        # block: a run of 1..max_block scenes to a new start position
+        length = randint(1, min(self.max_block, n - 1))
+        start = randint(0, n - length)
+        dest = randint(0, n - length - 1)
+        return ('block', start, length, dest + 1 if dest >= start else dest)
+
+    def commit(self, state, move):
+        """Update the pools for `move`, before it is applied to `state`."""
+        if move is None:
+            return
+        if move[0] == 'add':
+            self.addable.discard(move[2])
+            if move[2] not in self.included:
+                self.removable.add(move[2])
+        elif move[0] == 'remove':
+            self.removable.discard(state[move[1]])
+            self.addable.add(state[move[1]])
+        elif move[0] == 'replace':
+            self.removable.discard(state[move[1]])
+            self.addable.add(state[move[1]])
+            self.addable.discard(move[2])
+            if move[2] not in self.included:
+                self.removable.add(move[2])
+
+    def record(self, delta_e, accepted):
+        if self.selector is not None and self.last_operator is not None:
+            self.selector.record(self.last_operator, delta_e, accepted)
+
+
+# cells read as missing (and so as 0), the same defaults pandas.read_csv uses
+CSV_NA_VALUES = frozenset(['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+                           '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'])
+_CELL_VALUES = {'0': 0, '1': 1}
+LOAD_CACHE_VERSION = 1
+
+
+class EmptyCsvError(ValueError):
+    """The CSV has no header row."""
+
+
+def _cell_value(cell):
+    value = _CELL_VALUES.get(cell)
+    if value is not None:
+        return value
+    cell = cell.strip()
+    if cell in CSV_NA_VALUES:
+        return 0
     try:
-        df = pd.read_csv(path_to_csv, index_col=0, header=0)
-        
-        # Fill all empty cells (read as NaN) with 0 before converting
-        df_filled = df.fillna(0)
-        
-        # Get actor names from columns
-        actor_names = list(df_filled.columns)
-        
-        # Get scene times from index (the first column)
-        scene_times = list(df_filled.index.values)
-        
-        # Get the matrix as numpy array
-        sa_matrix = df_filled.to_numpy().astype(int)
-        
-        # Ensure scene_times are numbers
+        return int(float(cell))
+    except ValueError:
+        return int(cell)  # raises the usual "invalid literal for int()" error
+
+
+def _actor_names(header_cells, start=1):
+    # unnamed columns and duplicate names are labelled the way pandas does
+    # (start: the column number of the first header cell)
+    names = []
+    seen = {}
+    for column_ix, name in enumerate(header_cells, start=start):
+        if not name:
+            name = f"Unnamed: {column_ix}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _parse_csv(path_to_csv):
+    # header row of actor names, then one row per scene: scene time and a 0/1 grid
+    with open(path_to_csv, newline='', encoding='utf-8-sig') as f:
+        rows = [row for row in csv.reader(f) if any(cell.strip() for cell in row)]
+    if not rows:
+        raise EmptyCsvError("The CSV file is in empty.")
+
+    n_fields = len(rows[0])
+    if len(rows) > 1 and len(rows[1]) == n_fields + 1:
+        # like pandas: a first data row one field longer than the header means
+        # the header has no cell over the scene times, so all of it names actors
+        actor_names = _actor_names(rows[0], start=0)
+        n_fields += 1
+    else:
+        actor_names = _actor_names(rows[0][1:])
+    sa_matrix = np.zeros((len(rows) - 1, len(actor_names)), dtype=np.int64)
+    scene_time_cells = []
+    for row_ix, row in enumerate(rows[1:]):
+        if len(row) > n_fields:
+            raise ValueError(f"Expected {n_fields} fields in line {row_ix + 2}, saw {len(row)}")
+        scene_time_cells.append(row[0].strip())
+        sa_matrix[row_ix, :len(row) - 1] = [_cell_value(cell) for cell in row[1:]]
+
+    # 0/1 grids (the normal case) are kept as uint8
+    if not sa_matrix.size or (sa_matrix.min() >= 0 and sa_matrix.max() <= 255):
+        sa_matrix = sa_matrix.astype(np.uint8)
+
+    try:
+        scene_times_numeric = [int(float(t)) for t in scene_time_cells]
+    except ValueError:
+        raise ValueError("The first column (scene times/index) contains non-numeric values.")
+    return sa_matrix, actor_names, scene_times_numeric
+
+
+def load_cache_path(path_to_csv):
+    """Where load_data keeps the parsed copy of a CSV."""
+    return path_to_csv + '.npz'
+
+
+def _read_load_cache(path_to_csv, source):
+    try:
+        with np.load(load_cache_path(path_to_csv), allow_pickle=False) as cached:
+            if (int(cached['version']) != LOAD_CACHE_VERSION or int(cached['source_size']) != source.st_size
+                    or int(cached['source_mtime_ns']) != source.st_mtime_ns):
+                return None
+            return cached['sa_matrix'], cached['actor_names'].tolist(), cached['scene_time'].tolist()
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _write_load_cache(path_to_csv, source, sa_matrix, actor_names, scene_times):
+    # written next to the CSV and swapped in atomically; an unwritable folder just means no cache
+    cache_path = load_cache_path(path_to_csv)
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(cache_path)), suffix='.tmp')
         try:
-            scene_times_numeric = [int(t) for t in scene_times]
-        except ValueError:
-            raise ValueError("The first column (scene times/index) contains non-numeric values.")
-        
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, version=LOAD_CACHE_VERSION, source_size=source.st_size,
+                         source_mtime_ns=source.st_mtime_ns, sa_matrix=sa_matrix,
+                         actor_names=np.array(actor_names, dtype=str), scene_time=np.array(scene_times, dtype=np.int64))
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    except OSError:
+        pass
+
+
+def load_data(path_to_csv, cache=True):
+    """Loads all data from the CSV.
+
+    With cache=True the parsed matrix is also saved next to the CSV
+    (see load_cache_path) and reused while the CSV keeps its size and
+    modification time.
+    """
+    try:
+        source = os.stat(path_to_csv)
+        if cache:
+            cached = _read_load_cache(path_to_csv, source)
+            if cached is not None:
+                return cached
+
+        sa_matrix, actor_names, scene_times_numeric = _parse_csv(path_to_csv)
+        if cache:
+            _write_load_cache(path_to_csv, source, sa_matrix, actor_names, scene_times_numeric)
         return sa_matrix, actor_names, scene_times_numeric
-        
+
     except FileNotFoundError:
         raise FileNotFoundError(f"File not found: {path_to_csv}")
-    except pd.errors.EmptyDataError:
+    except EmptyCsvError:
         raise ValueError("The CSV file is in empty.")
     except Exception as e:
         raise ValueError(f"Error reading CSV: {e}. Ensure it has a header (actor names) and an index col (scene times).")
 
 
-# --- THIS FUNCTION CONTAINS THE INDEXING FIX ---
-def make_schedule(max_hours, min_hours, sa_matrix, scene_time, actors_list, actors_to_ignore, scenes_to_include, scenes_to_avoid):
+# --- Problem compilation ---
+class ScheduleProblem:
+    """A production with its hard constraints applied, compiled once before a search.
+
+    `scenes` are the 0-based scenes a schedule may use: not avoided and
+    without an ignored actor. The search runs on the local problem made of
+    just those rows (`local_matrix`, `local_time`), so a local state
+    [i, j, ...] stands for scenes[i], scenes[j], ... and can never break a
+    hard constraint; `to_scenes` and `to_local` map between the two. `required` are the local
+    indices of the included scenes, and `dropped_includes` the included
+    scenes (0-based) that cannot be used. Arrays are read-only and lists are
+    tuples; build one with compile_problem.
+    """
+
+    __slots__ = ('sa_matrix', 'scene_time', 'actors_to_ignore', 'scenes_to_include_0idx', 'scenes_to_avoid_0idx',
+                 'scenes', 'local_index', 'local_matrix', 'local_time', 'required', 'dropped_includes')
+
+    def __init__(self, sa_matrix, scene_time, actors_to_ignore, scenes_to_include_0idx, scenes_to_avoid_0idx,
+                 scenes, required, dropped_includes):
+        self.sa_matrix = _read_only(np.asarray(sa_matrix))
+        self.scene_time = _read_only(np.asarray(scene_time))
+        self.actors_to_ignore = tuple(actors_to_ignore)
+        self.scenes_to_include_0idx = tuple(scenes_to_include_0idx)
+        self.scenes_to_avoid_0idx = tuple(scenes_to_avoid_0idx)
+        self.scenes = _read_only(np.asarray(scenes, dtype=int))
+        local_index = np.full(len(self.sa_matrix), -1)
+        local_index[self.scenes] = np.arange(len(self.scenes))
+        self.local_index = _read_only(local_index)
+        self.local_matrix = _read_only(self.sa_matrix[self.scenes])
+        self.local_time = _read_only(self.scene_time[self.scenes])
+        self.required = tuple(required)
+        self.dropped_includes = tuple(dropped_includes)
+
+    def __len__(self):
+        return len(self.scenes)
+
+    def to_scenes(self, local_state):
+        """0-based scene numbers of a local state."""
+        return [int(self.scenes[i]) for i in local_state]
+
+    def to_local(self, scenes):
+        """Local state for 0-based scene numbers, in order, leaving out unusable scenes and repeats."""
+        n_scenes = len(self.local_index)
+        local = (int(self.local_index[s]) for s in scenes if 0 <= s < n_scenes)
+        return list(dict.fromkeys(ix for ix in local if ix >= 0))
+
+
+def _read_only(array):
+    # a read-only view, so the caller's own array stays writable
+    view = array.view()
+    view.setflags(write=False)
+    return view
 
-    t_max = 105
-    t_min = 0
-    step_max = 10000
 
-    # --- THIS IS THE FIX ---
-    # Convert 1-based UI lists to 0-based algorithm lists
-    n_scenes_total = len(sa_matrix)
+def compile_problem(sa_matrix, scene_time, actors_to_ignore, scenes_to_include, scenes_to_avoid):
+    # Applies the hard constraints once and translates the 1-based UI scene
+    # lists to 0-based. Avoided scenes and scenes with an ignored actor leave
+    # the candidate pool; an included scene that is also one of those is
+    # dropped (avoid and ignore win, as before).
+    sa_matrix = np.asarray(sa_matrix)
+    n_scenes_total, n_actors = sa_matrix.shape
     scenes_to_include_0idx = [s - 1 for s in scenes_to_include if s - 1 < n_scenes_total]
     scenes_to_avoid_0idx = [s - 1 for s in scenes_to_avoid if s - 1 < n_scenes_total]
-    # --- END OF FIX ---
 
-    # --- FIX: Use 0-indexed lists for start_state ---
-    start_state = [scene for scene in scenes_to_include_0idx if scene not in scenes_to_avoid_0idx]
-    start_state = list(set(start_state)) # Remove duplicates
-    
-    if not start_state:
-        # If no scenes to include, start with a random valid scene
-        possible_starts = list(set(range(n_scenes_total)) - set(scenes_to_avoid_0idx))
-        if possible_starts:
-            start_state = [possible_starts[randint(0, len(possible_starts)-1)]]
+    ignored = [a - 1 for a in actors_to_ignore if 1 <= a <= n_actors]
+    blocked = sa_matrix[:, ignored].any(axis=1) if ignored else np.zeros(n_scenes_total, dtype=bool)
+    blocked |= get_avoided_scene_mask(n_scenes_total, scenes_to_avoid_0idx)
+    scenes = np.flatnonzero(~blocked)
+
+    local_ix = {int(scene): ix for ix, scene in enumerate(scenes)}
+    required, dropped_includes = [], []
+    for scene in dict.fromkeys(scenes_to_include_0idx):
+        if scene in local_ix:
+            required.append(local_ix[scene])
+        elif 0 <= scene < n_scenes_total:
+            dropped_includes.append(scene)
+    return ScheduleProblem(sa_matrix, scene_time, actors_to_ignore, scenes_to_include_0idx, scenes_to_avoid_0idx,
+                           scenes, required, dropped_includes)
+
+
+def lower_bound(problem, max_hours, min_hours):
+    # Energy no schedule of the compiled problem can beat, from the terms
+    # that do not depend on the order (wait time is bounded by 0):
+    # - every actor of the included scenes is called (50 each) and works
+    #   short (500) if all their scenes add up to under an hour;
+    # - the time window penalty is at least the smallest one over all totals
+    #   a selection with the included scenes can reach (subset sums of the
+    #   other scene times, as a bitset);
+    # - filling the window may need further actors: a scene with m actors
+    #   outside the included cast needs all m called, so with k more actors
+    #   only scenes with m <= k can be added, and sharing each one's time
+    #   out over its m new actors, the k actors with the largest shares cap
+    #   what they add to the scenes the included cast can play alone. Of
+    #   those k, all but the ones who could work an hour work short.
+    # Without included scenes a schedule still needs one scene, or pays
+    # 999999 for being empty.
+    present = problem.local_matrix == 1
+    durations = problem.local_time
+    max_time = max_hours*60
+    min_time = min_hours*60
+    empty_energy = 999999 + _time_penalty(np.zeros(1), max_time, min_time)[0]
+    if not len(durations):
+        return empty_energy
+
+    short = (durations @ present > 0) & (durations @ present < 60)
+    required = list(problem.required)
+    is_required = np.zeros(len(durations), dtype=bool)
+    is_required[required] = True
+    required_time = durations[required].sum()
+
+    optional = durations[~is_required]
+    if np.all(np.mod(durations, 1) == 0):
+        sums = 1
+        for d in optional.astype(int).tolist():
+            sums |= sums << d
+        totals = mask_to_indices(sums, int(optional.sum()) + 1) + required_time
+        if not required and not np.any(durations == 0):
+            totals = totals[totals > 0]
+    else:
+        # only whole minutes fit the bitset; fall back to the window clipped
+        # to the range of totals
+        lowest = required_time if required else durations.min()
+        totals = np.clip([min_time, max_time], lowest, durations.sum())
+    time_floor = _time_penalty(totals, max_time, min_time).min()
+
+    cast = present[is_required].any(axis=0)
+    new_actors = present & ~cast
+    free = ~is_required & ~new_actors.any(axis=1)
+    locked = ~is_required & ~free
+    n_scene_new = new_actors[locked].sum(axis=1)
+    # share[m, a]: time actor a can add through scenes with exactly m new actors
+    share = np.zeros((len(cast) + 1, len(cast)))
+    np.add.at(share, n_scene_new, new_actors[locked] * (durations[locked] / n_scene_new)[:, None])
+    # most time k new actors can add: the top k shares from scenes with m <= k
+    shares = np.sort(share.cumsum(axis=0)[:, ~cast], axis=1)[:, ::-1]
+    top = np.concatenate((np.zeros((len(shares), 1)), shares.cumsum(axis=1)), axis=1)
+    n_new = np.arange(np.count_nonzero(~cast) + 1)
+    reach = required_time + durations[free].sum() + top[n_new, n_new]
+    n_short_new = np.maximum(n_new - np.count_nonzero(~cast & ~short), 0)
+    fill_cost = 50 * n_new + 500 * n_short_new + np.maximum(time_floor, 1000 * np.maximum(min_time - reach, 0))
+    min_new = 0 if required else present.sum(axis=1).min()
+    bound = 50 * np.count_nonzero(cast) + 500 * np.count_nonzero(cast & short) + fill_cost[n_new >= min_new].min()
+    if not required:
+        cheapest_scene = (50 * present.sum(axis=1) + 500 * (present & short).sum(axis=1)).min()
+        bound = min(max(bound, cheapest_scene + time_floor), empty_energy)
+    return bound
+
+
+def _time_penalty(total_time, max_time, min_time):
+    # energy_function's time window penalty for an array of total times
+    penalty = np.where(total_time > max_time, 1000 * (total_time - max_time), 0)
+    return np.where(total_time < min_time, 1000 * (min_time - total_time), penalty)
+
+
+# --- Exact solver for small productions ---
+EXACT_MAX_SCENES = 16
+
+
+def _subset_table(values, combine):
+    # table[mask] = combine of values[i] over the bits i set in mask, for all
+    # 2**len(values) masks; built by doubling so every entry is one operation
+    n = len(values)
+    table = np.zeros((1 << n,) + np.shape(values[0]), dtype=np.asarray(values[0]).dtype)
+    for i in range(n):
+        table[1 << i: 2 << i] = combine(table[:1 << i], values[i])
+    return table
+
+
+def _best_order(cast_words, durations, wait_limit):
+    # Minimum total wait over all orders of a fixed scene set (talent
+    # scheduling DP over subsets). While scene j runs after the set B, an
+    # actor waits if they have a scene in B and one after j but none in j.
+    # Returns (wait, order as local indices), or (None, None) if no order
+    # waits less than wait_limit.
+    n = len(durations)
+    full = (1 << n) - 1
+    union = _subset_table(cast_words, np.bitwise_or)
+    masks = np.arange(1 << n)
+    bits = 1 << np.arange(n)
+
+    cost = np.empty((1 << n, n))
+    for j in range(n):
+        after = union[(full ^ masks) & ~bits[j]]
+        waiting = union & after & ~cast_words[j]
+        cost[:, j] = popcount(waiting).sum(axis=1) * durations[j]
+    cost[(masks[:, None] & bits[None, :]) != 0] = np.inf
+
+    # f[B]: least wait to schedule everything not in B, once B is done
+    f = np.zeros(1 << n)
+    layer = popcount(masks.astype(np.uint64))
+    for k in range(n - 1, -1, -1):
+        B = masks[layer == k]
+        f[B] = (cost[B] + f[B[:, None] | bits[None, :]]).min(axis=1)
+    if f[0] >= wait_limit:
+        return None, None
+
+    order = []
+    B = 0
+    while B != full:
+        j = int(np.argmin(cost[B] + f[B | bits]))
+        order.append(j)
+        B |= 1 << j
+    return f[0], order
+
+
+def solve_exact(sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore, scenes_to_include_0idx, scenes_to_avoid_0idx, time_limit=None,
+                max_scenes=EXACT_MAX_SCENES):
+    # Exact minimum of energy_function over the anneal's search space
+    # (avoided scenes never added, included scenes always kept).
+    # The energy splits into a part that only depends on which scenes are
+    # chosen (calls, time window, hard constraints, short work) and the wait
+    # time, which depends on their order. Scene sets are visited in order of
+    # that set cost and each one is ordered optimally with _best_order,
+    # until the set cost alone cannot beat the best schedule found.
+    # Returns (best_state, proven); proven is False if time_limit (seconds)
+    # ran out first. The tables grow as 2**n in the n allowed scenes, so more
+    # than max_scenes of them is a ValueError.
+    n_scenes, n_actors = sa_matrix.shape
+    scene_time = np.array(scene_time)
+    present = sa_matrix == 1
+    counted = get_counted_actors(n_actors, actors_to_ignore)
+    scene_ignore_hits, _ = get_scene_ignore_hits(sa_matrix, actors_to_ignore)
+    max_time = max_hours*60
+    min_time = min_hours*60
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+
+    avoided = set(s for s in scenes_to_avoid_0idx if 0 <= s < n_scenes)
+    allowed = [s for s in range(n_scenes) if s not in avoided]
+    if not allowed:
+        return [], True
+    if len(allowed) > max_scenes:
+        raise ValueError(f"The exact solver handles at most {max_scenes} scenes, got {len(allowed)}.")
+    required_mask = 0
+    for local_ix, scene in enumerate(allowed):
+        if scene in scenes_to_include_0idx:
+            required_mask |= 1 << local_ix
+
+    # --- Set cost of every subset of the allowed scenes ---
+    durations = scene_time[allowed]
+    total_time = _subset_table(list(durations), np.add)
+    work = _subset_table([(durations[k] * present[s]).astype(np.int32) for k, s in enumerate(allowed)], np.add)
+    called = popcount(_subset_table(list(pack_bits(present[allowed])), np.bitwise_or)).sum(axis=1)
+    ignore_hits = _subset_table(list(scene_ignore_hits[allowed]), np.add)
+    time_penalty = np.where(total_time > max_time, 1000 * (total_time - max_time), 0)
+    time_penalty = np.where(total_time < min_time, 1000 * (min_time - total_time), time_penalty)
+    set_cost = (called * 50 + time_penalty + ignore_hits * 1000000 +
+                (counted & (work > 0) & (work < 60)).sum(axis=1) * 500)
+
+    best_state = []
+    best_energy = np.inf
+    if not required_mask:
+        best_energy = 999999 + time_penalty[0]
+
+    masks = np.arange(len(set_cost))
+    candidates = masks[((masks & required_mask) == required_mask) & (masks != 0)]
+    candidates = candidates[np.argsort(set_cost[candidates], kind='stable')]
+    counted_casts = pack_bits(present[allowed] & counted)
+
+    for mask in candidates:
+        if set_cost[mask] >= best_energy:
+            return best_state, True
+        if deadline is not None and time.monotonic() > deadline:
+            return best_state, False
+        members = [k for k in range(len(allowed)) if (mask >> k) & 1]
+        wait, order = _best_order(counted_casts[members], durations[members], best_energy - set_cost[mask])
+        if wait is not None:
+            best_energy = set_cost[mask] + wait
+            best_state = [allowed[members[j]] for j in order]
+    return best_state, True
+
+
+# --- Parallel multi-start ---
+# One process pool is kept for the life of the process, so repeated solves
+# (e.g. from the web app) do not pay process startup every time.
+_solver_pool = None
+_solver_pool_workers = None
+_solver_pool_lock = threading.Lock()
+# Chains that must be stoppable or report progress get a shared Event and a
+# progress Queue from one manager process, started the first time it is needed.
+_chain_manager = None
+
+
+def get_solver_pool(n_workers=None):
+    """Returns the shared process pool, (re)creating it if the worker count changed."""
+    global _solver_pool, _solver_pool_workers
+    n_workers = n_workers or os.cpu_count() or 1
+    with _solver_pool_lock:
+        if _solver_pool is None or _solver_pool_workers != n_workers:
+            if _solver_pool is not None:
+                _solver_pool.shutdown(wait=False)
+            _solver_pool = ProcessPoolExecutor(max_workers=n_workers)
+            _solver_pool_workers = n_workers
+        return _solver_pool
+
+
+def shutdown_solver_pool():
+    global _solver_pool, _solver_pool_workers, _chain_manager
+    with _solver_pool_lock:
+        if _solver_pool is not None:
+            _solver_pool.shutdown()
+        if _chain_manager is not None:
+            _chain_manager.shutdown()
+        _solver_pool = None
+        _solver_pool_workers = None
+        _chain_manager = None
+
+
+def get_chain_manager():
+    global _chain_manager
+    with _solver_pool_lock:
+        if _chain_manager is None:
+            _chain_manager = multiprocessing.Manager()
+        return _chain_manager
+
+
+def _run_chain(chain_seed, schedule_kwargs, collect_stats=False):
+    # runs in a worker process: one independent annealing chain,
+    # returned with its solver stats when collect_stats is set
+    if not collect_stats:
+        return make_schedule(seed=chain_seed, **schedule_kwargs)
+    stats = {}
+    return make_schedule(seed=chain_seed, stats=stats, **schedule_kwargs), stats
+
+
+def _queue_progress(progress_queue, chain, progress):
+    # progress_callback of a chain in a worker process
+    progress_queue.put((chain, progress))
+
+
+def _run_chains(pool, chain_seeds, schedule_kwargs, collect_stats, stop_event, progress_callback, poll_seconds=0.1):
+    # Runs the chains on the pool while relaying stop_event to them and
+    # their progress back: each report passed to progress_callback is the
+    # latest one of the chain with the best energy so far.
+    manager = get_chain_manager()
+    chain_stop = manager.Event()
+    progress_queue = manager.Queue() if progress_callback is not None else None
+    futures = []
+    for chain, chain_seed in enumerate(chain_seeds):
+        chain_kwargs = dict(schedule_kwargs, stop_event=chain_stop)
+        if progress_queue is not None:
+            chain_kwargs['progress_callback'] = functools.partial(_queue_progress, progress_queue, chain)
+        futures.append(pool.submit(_run_chain, chain_seed, chain_kwargs, collect_stats))
+
+    latest = {}
+    pending = set(futures)
+    while pending:
+        _, pending = wait(pending, timeout=poll_seconds)
+        if stop_event is not None and stop_event.is_set():
+            chain_stop.set()
+        if progress_queue is None:
+            continue
+        n_reports = 0
+        while not progress_queue.empty():
+            chain, progress = progress_queue.get()
+            latest[chain] = progress
+            n_reports += 1
+        if n_reports:
+            progress_callback(min(latest.values(), key=lambda progress: progress["best_energy"]))
+    return [future.result() for future in futures]
+
+
+MOVE_TYPES = MoveGenerator.OPERATORS
+
+
+def _move_stats(proposed, accepted):
+    return {kind: {"proposed": proposed[kind], "accepted": accepted[kind],
+                   "acceptance_rate": accepted[kind] / proposed[kind] if proposed[kind] else 0.0}
+            for kind in MOVE_TYPES}
+
+
+def _merge_chain_stats(chain_stats, best_ix, seconds):
+    # counters summed over the chains, result fields from the winning chain
+    merged = dict(chain_stats[best_ix], solver='anneal', n_chains=len(chain_stats), seconds=seconds)
+    for key in ('steps', 'neighbour_seconds', 'energy_seconds', 'commit_seconds'):
+        merged[key] = sum(stats.get(key, 0) for stats in chain_stats)
+    merged["steps_per_second"] = merged["steps"] / seconds if seconds else 0.0
+    proposed = {kind: sum(stats["moves"][kind]["proposed"] for stats in chain_stats if "moves" in stats) for kind in MOVE_TYPES}
+    accepted = {kind: sum(stats["moves"][kind]["accepted"] for stats in chain_stats if "moves" in stats) for kind in MOVE_TYPES}
+    merged["moves"] = _move_stats(proposed, accepted)
+    return merged
+
+
+# --- THIS FUNCTION CONTAINS THE INDEXING FIX ---
+def make_schedule(max_hours, min_hours, sa_matrix, scene_time, actors_list, actors_to_ignore, scenes_to_include, scenes_to_avoid,
+                  n_candidates=1, n_chains=1, n_workers=None, seed=None,
+                  solver='anneal', exact_max_scenes=EXACT_MAX_SCENES, exact_time_limit=2.0, energy_cache=None,
+                  stop_event=None, progress_callback=None, progress_every=250,
+                  step_max=10000, t_max=105, t_min=0, cooling='linear', calibrate_t=False, patience=None,
+                  stats=None, moves='uniform', rng=None, problem=None, initial_state=None, initial_acceptance=0.8,
+                  gap_tolerance=None):
+    # n_candidates > 1 draws that many neighbours per step, scores them with
+    # energy_function_batch and takes the best one into the Metropolis test.
+    # n_chains > 1 runs that many independent chains on the shared process
+    # pool (n_workers processes) and returns the best of them.
+    # seed makes a run reproducible (chain k of a parallel run uses seed + k).
+    # rng, a SolverRandom, supplies every random draw of the run instead;
+    # by default one is made from seed. Nothing global is seeded, so runs
+    # in threads or processes do not disturb each other.
+    # solver='exact' returns the proven optimum from solve_exact when at most
+    # exact_max_scenes scenes can be picked, and anneals larger productions
+    # (with a warning); 'auto' does the same but also falls back to annealing
+    # if the exact solve takes longer than exact_time_limit seconds.
+    # energy_cache (an EnergyCache) memoizes move energies of revisited states;
+    # its hit/miss counts are left on the cache for the caller to read.
+    # stop_event (a threading.Event) ends the anneal early once set; the best
+    # state found so far is returned.
+    # progress_callback, if given, is called every progress_every anneal steps
+    # with a dict: step, step_max, temperature, energy, best_energy,
+    # acceptance_rate (over those steps) and best_state (0-indexed).
+    # With n_chains > 1 both are relayed to the chains (see _run_chains) and
+    # the reports come from whichever chain is best so far.
+    # cooling picks a schedule from COOLING_SCHEDULES between t_max and t_min
+    # over step_max steps; calibrate_t replaces t_max with a temperature
+    # calibrated from sampled move deltas; patience stops the anneal once the
+    # best energy has not improved for that many steps.
+    # stats, if a dict, is filled with solver instrumentation: solver, steps,
+    # seconds, steps_per_second, time spent proposing moves
+    # (neighbour_seconds), scoring them (energy_seconds) and applying accepted
+    # ones (commit_seconds), per-move-type counts under moves, and the final
+    # energy and breakdown, lower_bound (see lower_bound), gap (energy
+    # minus the bound; 0 proves the schedule optimal) and dropped_includes
+    # (the 1-based included scenes that are avoided or have an ignored actor,
+    # so no schedule can hold them). Timing adds a little overhead, so leave
+    # it None when not needed.
+    # gap_tolerance stops the anneal as soon as the best energy is within
+    # that many points of lower_bound; 0 stops only at a proven optimum.
+    # moves picks the neighbourhood: 'uniform' (MoveGenerator with all
+    # operators picked evenly), 'adaptive' (the same operators, picked by
+    # recent success; it can pay off with linear cooling on mid-sized
+    # productions) or 'basic' (add/remove/swap from propose_move).
+    # problem, a ScheduleProblem from compile_problem for these same
+    # arguments, skips compiling them again (e.g. across parallel chains).
+    # The search only sees its usable scenes, so avoided scenes and ignored
+    # actors never enter a state.
+    # initial_state (0-indexed scenes, e.g. the best order of an earlier run)
+    # warm-starts the anneal: it is repaired to the current constraints by
+    # dropping scenes that may not be used and inserting missing included
+    # scenes where they cost least. Pair it with a short, cool anneal, e.g.
+    # a low initial_acceptance (the uphill acceptance calibrate_t aims for).
+
+    run_start = time.perf_counter()
+    if problem is None:
+        problem = compile_problem(sa_matrix, scene_time, actors_to_ignore, scenes_to_include, scenes_to_avoid)
+    local_matrix, local_time = problem.local_matrix, problem.local_time
+    n_scenes_total = len(problem)
+    scenes_to_include_0idx = list(problem.required)
+
+    def finish(local_state):
+        return _schedule_result(problem.to_scenes(local_state), sa_matrix, scene_time, max_hours, min_hours,
+                                actors_to_ignore, actors_list, problem.scenes_to_include_0idx,
+                                problem.scenes_to_avoid_0idx)
+
+    bound = lower_bound(problem, max_hours, min_hours) if stats is not None or gap_tolerance is not None else None
+
+    # with no usable scene the empty schedule is the only one
+    if solver == 'exact' and n_scenes_total > exact_max_scenes:
+        print(f"Warning: {n_scenes_total} usable scenes are too many for the exact solver "
+              f"(at most {exact_max_scenes}); annealing instead.")
+    if not n_scenes_total or (solver != 'anneal' and n_scenes_total <= exact_max_scenes):
+        time_limit = None if solver == 'exact' else exact_time_limit
+        exact_state, proven = solve_exact(local_matrix, local_time, max_hours, min_hours, (),
+                                          scenes_to_include_0idx, (), time_limit, max_scenes=exact_max_scenes)
+        if proven:
+            result = finish(exact_state)
+            if stats is not None:
+                stats.update(solver='exact', steps=0, seconds=time.perf_counter() - run_start,
+                             energy=float(result[1]), breakdown=result[4],
+                             lower_bound=float(result[1]), gap=0.0,
+                             dropped_includes=[s + 1 for s in problem.dropped_includes])
+            return result
+
+    if rng is None:
+        rng = SolverRandom(seed)
+
+    if n_chains > 1:
+        if seed is None:
+            chain_seeds = [rng.randint(0, 2**31 - 1) for _ in range(n_chains)]
         else:
-            start_state = [0] # Fallback
-    # --- END OF FIX ---
-            
-    best_state = start_state
-    
-    # --- FIX: Pass 0-indexed list to energy_function ---
-    E_old, best_call_times, best_nr_calls, best_breakdown = energy_function(best_state, sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore, actors_list, scenes_to_avoid_0idx)
+            chain_seeds = [seed + k for k in range(n_chains)]
+        schedule_kwargs = dict(max_hours=max_hours, min_hours=min_hours, sa_matrix=sa_matrix, scene_time=scene_time,
+                               actors_list=actors_list, actors_to_ignore=actors_to_ignore,
+                               scenes_to_include=scenes_to_include, scenes_to_avoid=scenes_to_avoid,
+                               n_candidates=n_candidates, step_max=step_max, t_max=t_max, t_min=t_min,
+                               cooling=cooling, calibrate_t=calibrate_t, patience=patience, moves=moves,
+                               problem=problem, initial_state=initial_state, initial_acceptance=initial_acceptance,
+                               gap_tolerance=gap_tolerance)
+        pool = get_solver_pool(n_workers)
+        if stop_event is not None or progress_callback is not None:
+            results = _run_chains(pool, chain_seeds, dict(schedule_kwargs, progress_every=progress_every),
+                                  stats is not None, stop_event, progress_callback)
+        else:
+            results = list(pool.map(_run_chain, chain_seeds, [schedule_kwargs] * n_chains,
+                                    [stats is not None] * n_chains))
+        if stats is None:
+            return min(results, key=lambda result: result[1])
+        best_ix = min(range(n_chains), key=lambda ix: results[ix][0][1])
+        stats.update(_merge_chain_stats([chain_stats for _, chain_stats in results], best_ix,
+                                        time.perf_counter() - run_start))
+        return results[best_ix][0]
+
+    # From here on states are local to the compiled problem: no scene is
+    # avoided and no actor ignored, so those penalty checks are skipped.
+    if initial_state is not None:
+        start_state = problem.to_local(initial_state)
+    else:
+        start_state = list(scenes_to_include_0idx)
+    if not start_state and n_scenes_total:
+        # If no scenes to include, start with a random usable scene
+        start_state = [rng.randint(0, n_scenes_total - 1)]
+
+    # Moves are scored incrementally; the full energy_function only runs
+    # once, on the best state found, to get call times and breakdown.
+    evaluator = IncrementalEnergy(start_state, local_matrix, local_time, max_hours, min_hours, (), ())
+    _insert_missing(evaluator, scenes_to_include_0idx)
+    start_state = best_state = evaluator.state
+    if energy_cache is not None:
+        cache_problem_key = EnergyCache.problem_key(local_matrix, local_time, max_hours, min_hours, (), ())
+    E_old = evaluator.energy
     best_energy = E_old
+
+    def new_generator(state):
+        if moves == 'basic':
+            return None
+        return MoveGenerator(state, n_scenes_total, (), scenes_to_include_0idx,
+                             adaptive=(moves == 'adaptive'), rng=rng)
+
+    generator = new_generator(start_state)
+    if generator is not None:
+        propose = generator.propose
+    else:
+        def propose(state):
+            return propose_move(state, (), scenes_to_include_0idx, local_matrix, rng)
+
+    if calibrate_t:
+        calibration = IncrementalEnergy(start_state, local_matrix, local_time, max_hours, min_hours, (), ())
+        calibration_generator = new_generator(start_state)
+        if calibration_generator is not None:
+            calibrated_t = calibrate_temperature(calibration, calibration_generator.propose,
+                                                 initial_acceptance=initial_acceptance,
+                                                 commit=calibration_generator.commit)
+        else:
+            calibrated_t = calibrate_temperature(calibration, propose, initial_acceptance=initial_acceptance)
+        if calibrated_t:
+            t_max = calibrated_t
+    schedule = COOLING_SCHEDULES[cooling](t_min, t_max, step_max)
     
+    n_accepted = 0
+    last_improvement = 0
+    uniform = rng.random
+    timed = stats is not None
+    proposed = dict.fromkeys(MOVE_TYPES, 0)
+    accepted = dict.fromkeys(MOVE_TYPES, 0)
+    neighbour_seconds = energy_seconds = commit_seconds = 0.0
+    anneal_start = time.perf_counter()
+    steps_done = step_max
     for step in range(0, step_max):
-        t = update_t(step, t_min, t_max, step_max)
+        if stop_event is not None and step % 100 == 0 and stop_event.is_set():
+            steps_done = step
+            break
+        if patience is not None and step - last_improvement >= patience:
+            steps_done = step
+            break
+        if gap_tolerance is not None and best_energy - bound <= gap_tolerance:
+            steps_done = step
+            break
+        t = schedule.temperature(step)
 
-        # --- FIX: Pass 0-indexed lists to get_neighbour ---
-        new_state = get_neighbour(best_state, scenes_to_avoid_0idx, scenes_to_include_0idx, sa_matrix)
-        
-        # --- FIX: Pass 0-indexed list to energy_function ---
-        E_new, new_call_times, new_nr_calls, new_breakdown = energy_function(new_state, sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore, actors_list, scenes_to_avoid_0idx)
+        if progress_callback is not None and step and step % progress_every == 0:
+            progress_callback({
+                "step": step,
+                "step_max": step_max,
+                "temperature": t,
+                "energy": float(E_old),
+                "best_energy": float(best_energy),
+                "acceptance_rate": n_accepted / progress_every,
+                "best_state": problem.to_scenes(best_state),
+            })
+            n_accepted = 0
+
+        if timed:
+            t_propose = time.perf_counter()
+        if n_candidates > 1:
+            candidate_moves = [propose(evaluator.state) for _ in range(n_candidates)]
+            candidates = [apply_move(evaluator.state, m) for m in candidate_moves]
+            if timed:
+                t_score = time.perf_counter()
+            energies = energy_function_batch(candidates, local_matrix, local_time, max_hours, min_hours, (), ())
+            best_ix = int(np.argmin(energies))
+            move, E_new = candidate_moves[best_ix], energies[best_ix]
+        elif energy_cache is not None:
+            move = propose(evaluator.state)
+            if timed:
+                t_score = time.perf_counter()
+            cache_key = energy_cache.key(apply_move(evaluator.state, move), cache_problem_key)
+            E_new = energy_cache.get(cache_key)
+            if E_new is None:
+                E_new = evaluator.move_energy(move)
+                energy_cache.put(cache_key, E_new)
+        else:
+            move = propose(evaluator.state)
+            if timed:
+                t_score = time.perf_counter()
+            E_new = evaluator.move_energy(move)
+        if timed:
+            t_scored = time.perf_counter()
+            neighbour_seconds += t_score - t_propose
+            energy_seconds += t_scored - t_score
+            if move is not None:
+                proposed[move[0]] += 1
         
         delta_e = E_new - E_old
 
         if delta_e < 0:
-            best_state = new_state
-            best_energy = E_new
+            if generator is not None:
+                generator.commit(evaluator.state, move)
+            evaluator.commit(move)
             E_old = E_new
-            best_call_times = new_call_times
-            best_nr_calls = new_nr_calls
-            best_breakdown = new_breakdown
+            n_accepted += 1
+            schedule.record(True)
+            if timed and move is not None:
+                accepted[move[0]] += 1
+            # Keep the best state seen, not the one the walk ends on
+            if E_new < best_energy:
+                best_energy = E_new
+                best_state = evaluator.state
+                last_improvement = step
         else:
-            if safe_exp(-delta_e/t) > random():
-                best_state = new_state
+            if safe_exp(-delta_e/t) > uniform():
+                if generator is not None:
+                    generator.commit(evaluator.state, move)
+                evaluator.commit(move)
                 E_old = E_new
+                n_accepted += 1
+                schedule.record(True)
+                if timed and move is not None:
+                    accepted[move[0]] += 1
+            else:
+                schedule.record(False)
+        # the operator of a batch step is ambiguous, so only single proposals teach the selector
+        if generator is not None and n_candidates == 1:
+            generator.record(delta_e, E_old == E_new)  # E_old only equals E_new here if the move was taken
+        if timed:
+            commit_seconds += time.perf_counter() - t_scored
+
+    result = finish(best_state)
+    if timed:
+        anneal_seconds = time.perf_counter() - anneal_start
+        stats.update(solver='anneal', steps=steps_done, seconds=time.perf_counter() - run_start,
+                     steps_per_second=steps_done / anneal_seconds if anneal_seconds else 0.0,
+                     neighbour_seconds=neighbour_seconds, energy_seconds=energy_seconds,
+                     commit_seconds=commit_seconds, moves=_move_stats(proposed, accepted),
+                     energy=float(result[1]), breakdown=result[4],
+                     lower_bound=float(bound), gap=float(result[1] - bound),
+                     dropped_includes=[s + 1 for s in problem.dropped_includes])
+    return result
+
+
+def _insert_missing(evaluator, scenes):
+    # commits an add of every scene not yet in the evaluator's state, each at
+    # the position where it raises the energy least
+    for scene in scenes:
+        if scene in evaluator.state:
+            continue
+        moves = [('add', pos, scene) for pos in range(len(evaluator.state) + 1)]
+        evaluator.commit(min(moves, key=evaluator.move_energy))
+
+
+def _schedule_result(best_state, sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore, actors_list, scenes_to_include_0idx, scenes_to_avoid_0idx):
+    # full evaluation of the chosen state plus the usual warnings
+    best_energy, best_call_times, best_nr_calls, best_breakdown = energy_function(best_state, sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore, actors_list, scenes_to_avoid_0idx)
                 
     # Check if final state has hard constraint violations
     if best_energy >= 1000000:
@@ -323,68 +1758,58 @@ def make_schedule(max_hours, min_hours, sa_matrix, scene_time, actors_list, acto
     return best_state, best_energy, best_call_times, best_nr_calls, best_breakdown
 
 
-# --- THIS FUNCTION IS CORRECT ---
-def get_schedule_print(scene_matrix, name_list, scene_time, selected_scenes, actors_to_ignore=[]):
-    
-    # Handle empty schedule case
-    if not selected_scenes:
-        schedule_df = pd.DataFrame(index=name_list)
-        schedule_df['Wait (min)'] = 0
-        schedule_df['Total (min)'] = 0
-        if actors_to_ignore:
-            actors_to_ignore_0idx = [a - 1 for a in actors_to_ignore]
-            names_to_drop = [name_list[i] for i in actors_to_ignore_0idx if i < len(name_list)]
-            schedule_df = schedule_df.drop(names_to_drop, errors='ignore')
-        
-        schedule_df = schedule_df[schedule_df['Total (min)'] > 0]
-        return schedule_df
+def get_schedule_table(scene_matrix, name_list, scene_time, selected_scenes, actors_to_ignore=[]):
+    """Rows of the schedule table, without pandas.
 
-    # --- Schedule is NOT empty, proceed ---
-    selected_scenes_1indexed = [s + 1 for s in selected_scenes]
-    schedule_matrix = scene_matrix[selected_scenes, :]
-    
-    schedule_df = pd.DataFrame(schedule_matrix.T, columns=selected_scenes_1indexed, index=name_list)
-    schedule_df_display = schedule_df.replace({1: 'X', 0: ''})
-    
-    scene_times_np = np.array(scene_time)[selected_scenes]
-    scene_duration_map = pd.Series(scene_times_np, index=schedule_df.columns)
+    Returns (names, scene_numbers, cells, wait_times, total_times) for the
+    actors that are called and not ignored: cells[i][j] is 'X' if actor i
+    is in the j-th selected scene. Wait and total (span) times come from
+    get_actor_spans, the same pass the solver uses.
+    """
+    scene_matrix = np.asarray(scene_matrix)
+    n_actors = scene_matrix.shape[1] if scene_matrix.ndim == 2 else len(name_list)
+    scene_numbers = [s + 1 for s in selected_scenes]
+    schedule_matrix = scene_matrix[list(selected_scenes), :] if selected_scenes else np.zeros((0, n_actors), dtype=int)
+    _, _, total_times, work_times = get_actor_spans(schedule_matrix, np.array(scene_time)[list(selected_scenes)])
 
-    wait_times = []
-    total_times = []
-    
-    for actor_name, row in schedule_df.iterrows():
-        actor_scenes = row[row == 1]
-        
-        if actor_scenes.empty:
-            wait_times.append(0)
-            total_times.append(0)
-            continue
-            
-        actor_scene_indices = actor_scenes.index
-        
-        schedule_cols_list = list(schedule_df.columns)
-        first_scene_pos = schedule_cols_list.index(actor_scene_indices[0])
-        last_scene_pos = schedule_cols_list.index(actor_scene_indices[-1])
-        
-        actor_schedule_slice_durations = scene_times_np[first_scene_pos : last_scene_pos + 1]
-        
-        actor_total_time_min = np.sum(actor_schedule_slice_durations)
-        actor_work_time_min = scene_duration_map[actor_scene_indices].sum()
-        wait_time = actor_total_time_min - actor_work_time_min
-        
-        wait_times.append(int(wait_time))
-        total_times.append(int(actor_total_time_min))
+    shown = total_times > 0
+    for actor in actors_to_ignore:
+        if 0 < actor <= n_actors:
+            shown[actor - 1] = False
+    rows = np.flatnonzero(shown)
 
-    schedule_df_display['Wait (min)'] = wait_times
-    schedule_df_display['Total (min)'] = total_times
-    
-    # Drop IGNORED actors
-    if actors_to_ignore:
-        actors_to_ignore_0idx = [a - 1 for a in actors_to_ignore]
-        names_to_drop = [name_list[i] for i in actors_to_ignore_0idx if i < len(name_list)]
-        schedule_df_display = schedule_df_display.drop(names_to_drop, errors='ignore')
+    schedule_rows = schedule_matrix.T[rows]
+    cells = np.where(schedule_rows == 1, 'X', np.where(schedule_rows == 0, '', schedule_rows.astype(str)))
+    return ([name_list[i] for i in rows], scene_numbers, cells.tolist(),
+            (total_times - work_times)[rows].tolist(), total_times[rows].tolist())
 
-    # Drop UNCALLED actors
-    schedule_df_display = schedule_df_display[schedule_df_display['Total (min)'] > 0]
 
-    return schedule_df_display
\ No newline at end of file
+def schedule_table_html(scene_matrix, name_list, scene_time, selected_scenes, actors_to_ignore=[], classes=('data-grid',)):
+    """The schedule table as HTML, in the same markup DataFrame.to_html produced."""
+    names, scene_numbers, cells, wait_times, total_times = get_schedule_table(
+        scene_matrix, name_list, scene_time, selected_scenes, actors_to_ignore)
+    out = io.StringIO()
+    write = out.write
+    write(f'<table class="{" ".join(("dataframe",) + tuple(classes))}">\n  <thead>\n    <tr style="text-align: right;">\n      <th></th>\n')
+    for column in scene_numbers + ['Wait (min)', 'Total (min)']:
+        write(f'      <th>{column}</th>\n')
+    write('    </tr>\n  </thead>\n  <tbody>\n')
+    for name, row, wait, total in zip(names, cells, wait_times, total_times):
+        write(f'    <tr>\n      <th>{html.escape(str(name))}</th>\n')
+        for cell in row:
+            write(f'      <td>{cell}</td>\n')
+        write(f'      <td>{wait}</td>\n      <td>{total}</td>\n    </tr>\n')
+    write('  </tbody>\n</table>')
+    return out.getvalue()
+
+
+def get_schedule_print(scene_matrix, name_list, scene_time, selected_scenes, actors_to_ignore=[]):
+    # the schedule table as a DataFrame (see get_schedule_table)
+    import pandas as pd  # only needed for the DataFrame form
+
+    names, scene_numbers, cells, wait_times, total_times = get_schedule_table(
+        scene_matrix, name_list, scene_time, selected_scenes, actors_to_ignore)
+    schedule_df = pd.DataFrame(cells, columns=scene_numbers, index=names) if scene_numbers else pd.DataFrame(index=names)
+    schedule_df['Wait (min)'] = wait_times
+    schedule_df['Total (min)'] = total_times
+    return schedule_df
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+
+
+class MatrixStore:
+    """Content-addressed store for parsed scene/actor matrices.
+
+    Each upload is saved once as `<key>.npy` (the matrix, opened memory-mapped
+    on read) plus `<key>.json` (actor names and scene times), where key is a
+    SHA-256 of the parsed content. The same file uploaded by different users
+    maps to the same entry. Entries not used for `max_age` seconds are
+    removed by collect_garbage().
+    """
+
+    def __init__(self, root, max_age=7 * 24 * 3600, gc_interval=3600):
+        self.root = root
+        self.max_age = max_age
+        self.gc_interval = gc_interval
+        self._last_gc = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def content_key(sa_matrix, actors_list, scene_time):
+        sa_matrix = np.ascontiguousarray(sa_matrix)
+        digest = hashlib.sha256()
+        digest.update(repr((sa_matrix.shape, sa_matrix.dtype.str)).encode())
+        digest.update(sa_matrix.tobytes())
+        digest.update(json.dumps({"actors": list(actors_list), "scene_time": [int(t) for t in scene_time]}).encode())
+        return digest.hexdigest()
+
+    def _paths(self, key):
+        return os.path.join(self.root, key + '.npy'), os.path.join(self.root, key + '.json')
+
+    def _write_atomic(self, path, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def put(self, sa_matrix, actors_list, scene_time):
+        """Stores the parsed matrix (if new) and returns its key."""
+        key = self.content_key(sa_matrix, actors_list, scene_time)
+        matrix_path, meta_path = self._paths(key)
+        with self._lock:
+            if not (os.path.exists(matrix_path) and os.path.exists(meta_path)):
+                self._write_atomic(matrix_path, lambda f: np.save(f, np.ascontiguousarray(sa_matrix)))
+                meta = json.dumps({"actors": list(actors_list), "scene_time": [int(t) for t in scene_time]})
+                self._write_atomic(meta_path, lambda f: f.write(meta.encode()))
+            self._touch(key)
+        self.maybe_collect_garbage()
+        return key
+
+    def get(self, key):
+        """Returns (sa_matrix, actors_list, scene_time) or None if the key is unknown.
+
+        The matrix is a read-only memory map of the stored .npy.
+        """
+        if not key or not all(c in '0123456789abcdef' for c in key):
+            return None
+        matrix_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            sa_matrix = np.load(matrix_path, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            return None
+        self._touch(key)
+        return sa_matrix, meta["actors"], meta["scene_time"]
+
+    def get_meta(self, key):
+        """Actor names and scene times only, without opening the matrix."""
+        if not key or not all(c in '0123456789abcdef' for c in key):
+            return None
+        try:
+            with open(self._paths(key)[1]) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return meta["actors"], meta["scene_time"]
+
+    def _touch(self, key):
+        # the metadata mtime records when an entry was last used
+        try:
+            os.utime(self._paths(key)[1])
+        except FileNotFoundError:
+            pass
+
+    def maybe_collect_garbage(self):
+        if time.time() - self._last_gc >= self.gc_interval:
+            self.collect_garbage()
+
+    def collect_garbage(self, keep=()):
+        """Removes entries unused for max_age seconds, except keys in `keep`."""
+        cutoff = time.time() - self.max_age
+        removed = 0
+        with self._lock:
+            self._last_gc = time.time()
+            for name in os.listdir(self.root):
+                key, ext = os.path.splitext(name)
+                if ext != '.json' or key in keep:
+                    continue
+                matrix_path, meta_path = self._paths(key)
+                try:
+                    if os.path.getmtime(meta_path) >= cutoff:
+                        continue
+                    os.remove(meta_path)
+                    if os.path.exists(matrix_path):
+                        os.remove(matrix_path)
+                    removed += 1
+                except FileNotFoundError:
+                    continue
+            # matrices whose metadata never got written
+            for name in os.listdir(self.root):
+                key, ext = os.path.splitext(name)
+                path = os.path.join(self.root, name)
+                if ext in ('.npy', '.tmp') and not os.path.exists(self._paths(key)[1]) \
+                        and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+        return removed
@@ -0,0 +1,160 @@
+import itertools
+import numpy as np
+
+from make_schedule import compile_problem, energy_function, get_solver_pool, lower_bound, make_schedule
+
+# short, cool anneal for grid points that start from a neighbour's schedule
+WARM_ANNEAL = dict(cooling='adaptive', calibrate_t=True, initial_acceptance=0.2, step_max=8000, patience=3000)
+# make_schedule arguments a grid point may set that change the compiled problem
+CONSTRAINT_KEYS = ('actors_to_ignore', 'scenes_to_include', 'scenes_to_avoid')
+
+
+def hour_grid(min_hours_values, max_hours_values):
+    """(min_hours, max_hours) points of the product, leaving out windows with min_hours above max_hours."""
+    return [(min_hours, max_hours) for max_hours, min_hours in itertools.product(max_hours_values, min_hours_values)
+            if min_hours <= max_hours]
+
+
+def _point_kwargs(point):
+    # a grid point is a (min_hours, max_hours) pair or a dict of make_schedule keyword arguments
+    if isinstance(point, dict):
+        return dict(point)
+    min_hours, max_hours = point
+    return {"min_hours": min_hours, "max_hours": max_hours}
+
+
+def grid_neighbours(points):
+    """For each point (a dict), the indices of its nearest other points.
+
+    Every parameter's values are ranked; the distance between two points is
+    the summed rank difference, so on a full grid the neighbours are the
+    points one value step away in a single parameter.
+    """
+    keys = sorted({key for point in points for key in point})
+    ranks = np.zeros((len(points), len(keys)), dtype=int)
+    for k, key in enumerate(keys):
+        # keyed by repr, so unhashable values such as lists are fine
+        values = list({repr(point.get(key)): point.get(key) for point in points}.values())
+        try:
+            values.sort()
+        except TypeError:
+            pass  # unorderable values keep their first-seen order
+        rank = {repr(value): r for r, value in enumerate(values)}
+        ranks[:, k] = [rank[repr(point.get(key))] for point in points]
+    distance = np.abs(ranks[:, None, :] - ranks[None, :, :]).sum(axis=2)
+    np.fill_diagonal(distance, distance.max() + 1 if len(points) else 0)
+    return [np.flatnonzero(row == row.min()).tolist() if len(points) > 1 else [] for row in distance]
+
+
+def _anchor_points(neighbours):
+    # every point with no anchor among its neighbours becomes one, so each
+    # other point has an anchor next to it (a checkerboard on a full grid)
+    anchors = set()
+    for ix, near in enumerate(neighbours):
+        if not anchors.intersection(near):
+            anchors.add(ix)
+    return sorted(anchors)
+
+
+def _solve_point(kwargs):
+    # runs in a worker process: make_schedule at one grid point
+    return make_schedule(**kwargs)[0]
+
+
+def _solve_points(kwargs_list, n_workers):
+    if len(kwargs_list) == 1:
+        return [_solve_point(kwargs_list[0])]
+    return list(get_solver_pool(n_workers).map(_solve_point, kwargs_list))
+
+
+def sweep(grid, sa_matrix, scene_time, actors_list, actors_to_ignore=(), scenes_to_include=(), scenes_to_avoid=(),
+          n_workers=None, seed=None, warm_kwargs=None, **schedule_kwargs):
+    """Solves make_schedule at every point of a parameter grid in one call.
+
+    grid is a list of (min_hours, max_hours) pairs (see hour_grid) or of
+    dicts of make_schedule keyword arguments, each with max_hours and
+    min_hours. A dict may also set any of CONSTRAINT_KEYS in place of the
+    sweep's own; one problem is compiled per distinct set of constraints,
+    and each point is solved and scored against its own. About half of the
+    points (no two of them neighbours) are solved from scratch in parallel
+    with schedule_kwargs; the others start from the best schedule of a
+    solved neighbour with the short WARM_ANNEAL (updated with warm_kwargs).
+    Finally every point takes a neighbour's schedule if that keeps to its
+    constraints (usable scenes only, every usable included scene) and scores
+    better under its own parameters.
+
+    Returns one row per grid point, in grid order: the point's parameters,
+    scenes (1-based order), n_scenes, energy, lower_bound, gap, wait_time,
+    total_time, breakdown, call_times, start ("cold" or "warm") and source (grid index
+    of the solve the schedule came from).
+    """
+    points = [_point_kwargs(point) for point in grid]
+    if not points:
+        return []
+    shared = dict(actors_to_ignore=actors_to_ignore, scenes_to_include=scenes_to_include,
+                  scenes_to_avoid=scenes_to_avoid)
+    constraints = [dict(shared, **{key: point[key] for key in CONSTRAINT_KEYS if key in point}) for point in points]
+    compiled = {}
+    problems = []
+    for constraint in constraints:
+        key = tuple(tuple(sorted(set(constraint[name]))) for name in CONSTRAINT_KEYS)
+        if key not in compiled:
+            compiled[key] = compile_problem(sa_matrix, scene_time, *(constraint[name] for name in CONSTRAINT_KEYS))
+        problems.append(compiled[key])
+    warm_anneal = dict(WARM_ANNEAL, **(warm_kwargs or {}))
+
+    def point_kwargs(ix, anneal, **extra):
+        kwargs = dict(shared, sa_matrix=sa_matrix, scene_time=scene_time, actors_list=actors_list,
+                      seed=None if seed is None else seed + ix)
+        kwargs.update(schedule_kwargs, **anneal)
+        kwargs.update(points[ix], problem=problems[ix], **extra)
+        return kwargs
+
+    def evaluate(ix, state):
+        return energy_function(state, sa_matrix, scene_time, points[ix]['max_hours'], points[ix]['min_hours'],
+                               constraints[ix]['actors_to_ignore'], actors_list, problems[ix].scenes_to_avoid_0idx)
+
+    def fits(ix, state):
+        # state uses only scenes usable at point ix and holds all its usable included scenes
+        problem = problems[ix]
+        return (all(problem.local_index[s] >= 0 for s in state)
+                and set(problem.to_scenes(problem.required)) <= set(state))
+
+    def best_of(ix, sources):
+        # the source point whose schedule scores best at point ix, preferring ones that fit it
+        return min(sources, key=lambda source: (not fits(ix, states[source]), evaluate(ix, states[source])[0]))
+
+    neighbours = grid_neighbours(points)
+    anchors = _anchor_points(neighbours)
+    others = [ix for ix in range(len(points)) if ix not in set(anchors)]
+    states = [None] * len(points)
+
+    for ix, state in zip(anchors, _solve_points([point_kwargs(ix, {}) for ix in anchors], n_workers)):
+        states[ix] = state
+    starts = [states[best_of(ix, [n for n in neighbours[ix] if states[n] is not None] or anchors)] for ix in others]
+    warm = [point_kwargs(ix, warm_anneal, initial_state=start) for ix, start in zip(others, starts)]
+    if others:
+        for ix, state in zip(others, _solve_points(warm, n_workers)):
+            states[ix] = state
+
+    rows = []
+    for ix, point in enumerate(points):
+        source = best_of(ix, [ix] + neighbours[ix])
+        state = states[source]
+        energy, call_times, _, breakdown = evaluate(ix, state)
+        bound = lower_bound(problems[ix], point['max_hours'], point['min_hours'])
+        rows.append(dict(
+            point,
+            scenes=[s + 1 for s in state],
+            n_scenes=len(state),
+            energy=energy,
+            lower_bound=bound,
+            gap=energy - bound,
+            wait_time=breakdown["Wait Time (min)"],
+            total_time=breakdown["Total Time (min)"],
+            breakdown=breakdown,
+            call_times=call_times,
+            start="cold" if ix in anchors else "warm",
+            source=source,
+        ))
+    return rows
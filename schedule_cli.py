@@ -0,0 +1,209 @@
+"""Batch scheduling from the command line.
+
+Runs every CSV against every parameter set on a process pool and writes
+the schedules as JSON or CSV:
+
+    python schedule_cli.py prod_a.csv prod_b.csv --max-hours 3 4 --min-hours 2 -o results.json
+    python schedule_cli.py productions/*.csv --params whatif.json --format csv -o results.csv
+    python schedule_cli.py prod_a.csv --max-hours 3 4 5 6 --min-hours 2 --sweep
+
+A parameter file is a JSON list of objects with any of: name, max_hours,
+min_hours, include and avoid (1-based scene numbers), ignore (actor names
+or 1-based actor numbers), seed and other make_schedule keyword arguments
+(solver, step_max, cooling, calibrate_t, patience, gap_tolerance, ...). Values given on
+the command line are the defaults for every set.
+
+--sweep solves the hour grid of each CSV as one parameter_sweep.sweep:
+compiled once, neighbouring windows seeded from each other's schedules.
+Its records also say whether a window started cold or warm, and their
+seconds are those of the whole sweep.
+"""
+import argparse
+import contextlib
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+# make_schedule (and numpy) are imported in run_task, so argument errors
+# and --help return at once and pool workers only import what they use.
+
+PARAMETER_KEYS = ('name', 'max_hours', 'min_hours', 'include', 'avoid', 'ignore', 'seed')
+CSV_COLUMNS = ('csv', 'name', 'max_hours', 'min_hours', 'seed', 'energy', 'lower_bound', 'gap', 'n_scenes', 'scenes',
+               'total_time', 'wait_time', 'seconds', 'error')
+
+
+def parameter_sets(args):
+    """Parameter sets from --params, or the product of the hour lists given on the command line."""
+    defaults = {"include": args.include, "avoid": args.avoid, "ignore": args.ignore, "seed": args.seed}
+    if args.params:
+        with open(args.params) as f:
+            sets = json.load(f)
+        if not isinstance(sets, list) or not all(isinstance(params, dict) for params in sets):
+            raise ValueError(f"{args.params} must hold a JSON list of objects.")
+        defaults.update(max_hours=args.max_hours[0], min_hours=args.min_hours[0])
+        return [{**defaults, **params} for params in sets]
+    return [dict(defaults, max_hours=max_hours, min_hours=min_hours)
+            for max_hours, min_hours in itertools.product(args.max_hours, args.min_hours)]
+
+
+def resolve_actors(ignore, actors_list):
+    # actor names or 1-based numbers -> 1-based numbers, as the web form does
+    actor_name_to_index = {name: i + 1 for i, name in enumerate(actors_list)}
+    indices = []
+    for actor in ignore or []:
+        if isinstance(actor, int) or str(actor).isdigit():
+            indices.append(int(actor))
+        elif actor in actor_name_to_index:
+            indices.append(actor_name_to_index[actor])
+        else:
+            raise ValueError(f"Unknown actor: {actor}")
+    return indices
+
+
+def run_task(path, params):
+    """Solves one CSV with one parameter set; returns a result record (with "error" on failure)."""
+    from make_schedule import load_data, make_schedule
+
+    params = dict(params)
+    name = params.pop('name', None) or f"{params['max_hours']}h/{params['min_hours']}h"
+    record = {"csv": path, "name": name, "max_hours": params['max_hours'], "min_hours": params['min_hours'],
+              "seed": params.get('seed')}
+    start = time.perf_counter()
+    try:
+        sa_matrix, actors_list, scene_time = load_data(path)
+        extra = {key: value for key, value in params.items() if key not in PARAMETER_KEYS}
+        stats = {}
+        # solver warnings go to stderr so they cannot end up in the output on stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            best_state, best_energy, call_times, nr_calls, breakdown = make_schedule(
+                float(params['max_hours']), float(params['min_hours']), sa_matrix, scene_time, actors_list,
+                resolve_actors(params.get('ignore'), actors_list), list(params.get('include') or []),
+                list(params.get('avoid') or []), seed=params.get('seed'), stats=stats, **extra)
+    except Exception as e:
+        record.update(error=str(e), seconds=time.perf_counter() - start)
+        return record
+    record.update(
+        scenes=[s + 1 for s in best_state],
+        energy=float(best_energy),
+        lower_bound=stats['lower_bound'],
+        gap=stats['gap'],
+        breakdown={key: float(value) for key, value in breakdown.items()},
+        call_times={actor: int(minute) for actor, minute in call_times.items()},
+        seconds=time.perf_counter() - start,
+        error=None,
+    )
+    return record
+
+
+def run_sweep(path, args):
+    """Solves the --max-hours x --min-hours grid of one CSV as a sweep; returns one record per window."""
+    from make_schedule import load_data
+    from parameter_sweep import hour_grid, sweep
+
+    grid = hour_grid(args.min_hours, args.max_hours)
+    start = time.perf_counter()
+    try:
+        sa_matrix, actors_list, scene_time = load_data(path)
+        with contextlib.redirect_stdout(sys.stderr):
+            rows = sweep(grid, sa_matrix, scene_time, actors_list, resolve_actors(args.ignore, actors_list),
+                         list(args.include), list(args.avoid), n_workers=args.workers or None, seed=args.seed)
+    except Exception as e:
+        return [{"csv": path, "name": f"{max_hours}h/{min_hours}h", "max_hours": max_hours, "min_hours": min_hours,
+                 "seed": args.seed, "error": str(e), "seconds": time.perf_counter() - start}
+                for min_hours, max_hours in grid]
+    seconds = time.perf_counter() - start
+    return [{
+        "csv": path,
+        "name": f"{row['max_hours']}h/{row['min_hours']}h",
+        "max_hours": row['max_hours'],
+        "min_hours": row['min_hours'],
+        "seed": args.seed,
+        "scenes": row['scenes'],
+        "energy": float(row['energy']),
+        "lower_bound": float(row['lower_bound']),
+        "gap": float(row['gap']),
+        "breakdown": {key: float(value) for key, value in row['breakdown'].items()},
+        "call_times": {actor: int(minute) for actor, minute in row['call_times'].items()},
+        "start": row['start'],
+        "seconds": seconds,
+        "error": None,
+    } for row in rows]
+
+
+def write_json(records, f):
+    json.dump(records, f, indent=2)
+    f.write('\n')
+
+
+def write_csv(records, f):
+    # one row per run, with the score breakdown in extra columns
+    breakdown_keys = sorted({key for record in records for key in record.get('breakdown', {})})
+    writer = csv.writer(f)
+    writer.writerow(list(CSV_COLUMNS) + breakdown_keys)
+    for record in records:
+        breakdown = record.get('breakdown', {})
+        row = dict(record,
+                   n_scenes=len(record.get('scenes', [])),
+                   scenes=' '.join(str(s) for s in record.get('scenes', [])),
+                   total_time=breakdown.get('Total Time (min)', ''),
+                   wait_time=breakdown.get('Wait Time (min)', ''))
+        writer.writerow([row.get(column, '') if row.get(column) is not None else '' for column in CSV_COLUMNS]
+                        + [breakdown.get(key, '') for key in breakdown_keys])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter, epilog=__doc__)
+    parser.add_argument('csv_files', nargs='+', help="scene/actor matrix CSVs")
+    parser.add_argument('--params', help="JSON file with a list of parameter sets")
+    parser.add_argument('--max-hours', type=float, nargs='+', default=[8.0])
+    parser.add_argument('--min-hours', type=float, nargs='+', default=[2.0])
+    parser.add_argument('--include', type=int, nargs='*', default=[], help="scenes to include (1-based)")
+    parser.add_argument('--avoid', type=int, nargs='*', default=[], help="scenes to avoid (1-based)")
+    parser.add_argument('--ignore', nargs='*', default=[], help="actors to ignore (names or 1-based numbers)")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--sweep', action='store_true',
+                        help="solve the hour grid of each CSV as one warm-started sweep (not with --params)")
+    parser.add_argument('--workers', type=int, default=0, help="worker processes (default: one per CPU)")
+    parser.add_argument('--format', choices=('json', 'csv'), help="output format (default: from --output, else json)")
+    parser.add_argument('-o', '--output', default='-', help="output file, - for stdout")
+    args = parser.parse_args(argv)
+
+    if args.sweep and args.params:
+        parser.error("--sweep takes the hour grid from --max-hours and --min-hours, not --params")
+    try:
+        sets = parameter_sets(args)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    tasks = [(path, params) for path in args.csv_files for params in sets]
+    output_format = args.format or ('csv' if args.output.endswith('.csv') else 'json')
+
+    n_workers = min(args.workers or os.cpu_count() or 1, len(tasks))
+    if args.sweep:
+        # each sweep spreads its grid over the shared solver pool itself
+        records = [record for path in args.csv_files for record in run_sweep(path, args)]
+    elif n_workers <= 1:
+        records = [run_task(path, params) for path, params in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            records = list(pool.map(run_task, *zip(*tasks)))
+
+    writer = write_csv if output_format == 'csv' else write_json
+    if args.output == '-':
+        writer(records, sys.stdout)
+    else:
+        with open(args.output, 'w', newline='') as f:
+            writer(records, f)
+
+    failed = [record for record in records if record['error']]
+    for record in failed:
+        print(f"{record['csv']} [{record['name']}]: {record['error']}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
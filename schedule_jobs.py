@@ -0,0 +1,188 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    """Raised when a job cannot be queued because a depth limit is reached."""
+
+
+class Job:
+    """One queued solve. Status goes queued -> running -> done/failed/cancelled."""
+
+    def __init__(self, owner):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.stop_event = threading.Event()
+        self.cancelled = False
+        self.future = None
+        self.progress = None
+        self.progress_version = 0
+        self.changed = threading.Condition()
+
+    def set_progress(self, progress):
+        """Latest progress report from the solver; wakes up wait_for_change()."""
+        with self.changed:
+            self.progress = progress
+            self.progress_version += 1
+            self.changed.notify_all()
+
+    def notify_finished(self):
+        with self.changed:
+            self.progress_version += 1
+            self.changed.notify_all()
+
+    def wait_for_change(self, version, timeout=None):
+        """Blocks until progress_version moves past `version` or timeout; returns the new version."""
+        with self.changed:
+            self.changed.wait_for(lambda: self.progress_version != version, timeout)
+            return self.progress_version
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "progress": self.progress,
+        }
+
+
+class JobQueue:
+    """Runs scheduling jobs on a local worker pool.
+
+    `max_queued` bounds the number of queued + running jobs overall and
+    `max_per_owner` the number one owner (e.g. a browser session) may have
+    at once, so one huge run cannot starve everyone else; it must stay below
+    n_workers (unless there is only one worker) so one owner can never hold
+    every worker. Finished jobs are kept for `keep_seconds` so their results
+    can be fetched.
+    """
+
+    def __init__(self, n_workers=2, max_queued=16, max_per_owner=1, keep_seconds=3600):
+        if max_per_owner < 1 or (n_workers > 1 and max_per_owner >= n_workers):
+            raise ValueError(f"max_per_owner must be at least 1 and below n_workers ({n_workers}), "
+                             f"got {max_per_owner}")
+        self.max_queued = max_queued
+        self.max_per_owner = max_per_owner
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix='schedule-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, owner, fn, *args, **kwargs):
+        """Queue fn(*args, stop_event=..., progress_callback=..., **kwargs); returns the Job.
+
+        fn should stop early once stop_event is set, and may report progress
+        dicts through progress_callback.
+        """
+        with self._lock:
+            self._prune()
+            active = [job for job in self._jobs.values() if job.active]
+            if len(active) >= self.max_queued:
+                raise QueueFullError("The scheduler is busy. Please try again in a moment.")
+            if sum(1 for job in active if job.owner == owner) >= self.max_per_owner:
+                if self.max_per_owner == 1:
+                    raise QueueFullError("You already have a schedule running. Wait for it to finish or cancel it.")
+                raise QueueFullError(f"You already have {self.max_per_owner} schedules running. "
+                                     "Wait for them to finish or cancel one.")
+            job = Job(owner)
+            self._jobs[job.id] = job
+            job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        with self._lock:
+            if job.status != 'queued':
+                return
+            job.status = 'running'
+            job.started = time.time()
+        try:
+            result = fn(*args, stop_event=job.stop_event, progress_callback=job.set_progress, **kwargs)
+        except Exception as e:
+            with self._lock:
+                job.status = 'failed'
+                job.error = str(e)
+                job.finished = time.time()
+            job.notify_finished()
+            return
+        with self._lock:
+            job.status = 'cancelled' if job.cancelled else 'done'
+            job.result = None if job.cancelled else result
+            job.finished = time.time()
+        job.notify_finished()
+
+    def get(self, job_id, owner=None):
+        """The job with this id, or None (also if it belongs to another owner)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def cancel(self, job_id, owner=None):
+        """Cancel a queued or running job; returns False if there was nothing to cancel."""
+        job = self.get(job_id, owner)
+        if job is None:
+            return False
+        with self._lock:
+            if not job.active:
+                return False
+            job.cancelled = True
+            job.stop_event.set()
+            if job.status == 'queued':
+                job.future.cancel()
+                job.status = 'cancelled'
+                job.finished = time.time()
+        job.notify_finished()
+        return True
+
+    def finish(self, job_id, owner=None):
+        """Ask a running job to stop early and keep its best result so far."""
+        job = self.get(job_id, owner)
+        if job is None or job.status != 'running':
+            return False
+        job.stop_event.set()
+        return True
+
+    def position(self, job):
+        """Number of jobs queued ahead of this one (0 once it runs)."""
+        with self._lock:
+            if job.status != 'queued':
+                return 0
+            return sum(1 for other in self._jobs.values()
+                       if other.status == 'queued' and other.created < job.created)
+
+    def counts(self):
+        """Number of known jobs per status."""
+        with self._lock:
+            counts = dict.fromkeys(('queued', 'running', 'done', 'failed', 'cancelled'), 0)
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def _prune(self):
+        # drop finished jobs older than keep_seconds (caller holds the lock)
+        cutoff = time.time() - self.keep_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if not job.active and job.finished and job.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        for job in list(self._jobs.values()):
+            job.cancelled = True
+            job.stop_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
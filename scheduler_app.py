@@ -1,18 +1,226 @@
 import os
-import pandas as pd
-import numpy as np
-from flask import Flask, render_template_string, request, redirect, url_for, flash, session
+import uuid
+from flask import Flask, render_template_string, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context, g
 from werkzeug.utils import secure_filename
-from make_schedule import load_data, make_schedule, get_schedule_print
+from make_schedule import load_data, make_schedule, schedule_table_html, EnergyCache
+from schedule_jobs import JobQueue
+from matrix_store import MatrixStore
+from metrics import Registry
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24) 
 UPLOAD_FOLDER = 'uploads'
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Parallel annealing: number of independent chains per solve and the size
+# of the (reused) worker process pool. 0 workers means one per CPU.
+app.config['SOLVER_CHAINS'] = int(os.environ.get('SCHEDULER_CHAINS', 1))
+app.config['SOLVER_WORKERS'] = int(os.environ.get('SCHEDULER_WORKERS', 0)) or None
+# 'auto' solves small scene lists exactly and anneals the rest; 'exact' does the
+# same without a time limit on the exact solve
+app.config['SOLVER_MODE'] = os.environ.get('SCHEDULER_SOLVER', 'auto')
+# Annealing schedule: calibrated adaptive cooling with a generous step cap,
+# stopping once the best schedule has not improved for SCHEDULER_PATIENCE steps
+# or is within SCHEDULER_GAP_TOLERANCE points of the lower bound (0: proven optimal)
+app.config['GAP_TOLERANCE'] = float(os.environ.get('SCHEDULER_GAP_TOLERANCE', 0))
+app.config['SOLVER_ANNEAL'] = {
+    "cooling": os.environ.get('SCHEDULER_COOLING', 'adaptive'),
+    "calibrate_t": True,
+    "step_max": int(os.environ.get('SCHEDULER_STEP_MAX', 30000)),
+    "patience": int(os.environ.get('SCHEDULER_PATIENCE', 5000)),
+    "gap_tolerance": app.config['GAP_TOLERANCE'],
+}
+# Re-runs after an edit start from the session's last best order, repaired to
+# the new constraints, with a short anneal that rarely accepts uphill moves
+app.config['SOLVER_WARM'] = {
+    "cooling": 'adaptive',
+    "calibrate_t": True,
+    "initial_acceptance": float(os.environ.get('SCHEDULER_WARM_ACCEPTANCE', 0.2)),
+    "step_max": int(os.environ.get('SCHEDULER_WARM_STEP_MAX', 8000)),
+    "patience": int(os.environ.get('SCHEDULER_WARM_PATIENCE', 3000)),
+    "gap_tolerance": app.config['GAP_TOLERANCE'],
+}
+app.config['WARM_START_SESSIONS'] = int(os.environ.get('SCHEDULER_WARM_START_SESSIONS', 1000))
+# Energies of revisited states, shared by all single-chain solves. Off by
+# default: moves are already scored incrementally, so building and hashing
+# each new state costs about what a hit saves. Set an entry count to enable.
+app.config['ENERGY_CACHE_SIZE'] = int(os.environ.get('SCHEDULER_ENERGY_CACHE', 0))
+energy_cache = EnergyCache(app.config['ENERGY_CACHE_SIZE']) if app.config['ENERGY_CACHE_SIZE'] else None
+# Finished results per identical request, evicted by total size
+app.config['RESULT_CACHE_BYTES'] = int(os.environ.get('SCHEDULER_RESULT_CACHE_BYTES', 32 * 1024 * 1024))
+
+
+class ResultCache:
+    """LRU cache of finished results, bounded by their approximate size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def entry_size(results):
+        return len(results["table"]) + len(results["scenes"]) + 1024
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, results):
+        size = self.entry_size(results)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (results, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+
+result_cache = ResultCache(app.config['RESULT_CACHE_BYTES'])
+
+
+class LastSchedules:
+    """Best scene order (0-indexed) of each client's last solve, per matrix, for warm starts.
+
+    Holds the most recently used max_entries clients.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, client_id, matrix_key):
+        with self._lock:
+            entry = self._entries.get(client_id)
+            if entry is None or entry[0] != matrix_key:
+                return None
+            self._entries.move_to_end(client_id)
+            return list(entry[1])
+
+    def put(self, client_id, matrix_key, state):
+        with self._lock:
+            self._entries[client_id] = (matrix_key, tuple(int(s) for s in state))
+            self._entries.move_to_end(client_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+last_schedules = LastSchedules(app.config['WARM_START_SESSIONS'])
+
+
+def result_cache_key(matrix_key, schedule_args, seed):
+    """Matrix content key (see MatrixStore) plus the normalized scheduling parameters."""
+    digest = hashlib.sha256()
+    digest.update(matrix_key.encode())
+    digest.update(json.dumps({
+        "max_hours": float(schedule_args['max_hours']),
+        "min_hours": float(schedule_args['min_hours']),
+        "include": sorted(set(schedule_args['scenes_to_include'])),
+        "avoid": sorted(set(schedule_args['scenes_to_avoid'])),
+        "ignore": sorted(set(schedule_args['actors_to_ignore'])),
+        "seed": seed,
+        "solver": [app.config['SOLVER_MODE'], app.config['SOLVER_CHAINS'], app.config['SOLVER_ANNEAL']],
+    }).encode())
+    return digest.hexdigest()
+
+
+# Background solves: worker threads, total queue depth and jobs per user
+job_queue = JobQueue(
+    n_workers=int(os.environ.get('SCHEDULER_JOB_WORKERS', 2)),
+    max_queued=int(os.environ.get('SCHEDULER_MAX_QUEUED', 16)),
+    max_per_owner=int(os.environ.get('SCHEDULER_MAX_JOBS_PER_USER', 1))
+)
 
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
+# Parsed matrices live on the server, keyed by content hash; the session
+# only holds the key. Entries unused for SCHEDULER_MATRIX_MAX_AGE seconds are removed.
+app.config['MATRIX_STORE'] = os.environ.get('SCHEDULER_MATRIX_STORE', os.path.join(UPLOAD_FOLDER, 'matrices'))
+matrix_store = MatrixStore(app.config['MATRIX_STORE'],
+                           max_age=int(os.environ.get('SCHEDULER_MATRIX_MAX_AGE', 7 * 24 * 3600)))
+
+# --- Instrumentation, scraped from /metrics ---
+# SCHEDULER_TIMING_LOG=1 also logs the timings of every request and solve.
+app.config['TIMING_LOG'] = os.environ.get('SCHEDULER_TIMING_LOG', '') not in ('', '0')
+if app.config['TIMING_LOG']:
+    app.logger.setLevel(logging.INFO)
+
+metrics = Registry()
+CSV_PARSE_SECONDS = metrics.histogram('scheduler_csv_parse_seconds', 'Time to parse an uploaded CSV.')
+QUEUE_WAIT_SECONDS = metrics.histogram('scheduler_queue_wait_seconds', 'Time a job waited before a worker picked it up.')
+SOLVE_SECONDS = metrics.histogram('scheduler_solve_seconds', 'Wall time of make_schedule per job.', ['solver'])
+SOLVE_STARTS = metrics.counter('scheduler_solve_starts_total', 'Solves started cold or from the last schedule.', ['start'])
+RENDER_SECONDS = metrics.histogram('scheduler_render_seconds', 'Time to render results (schedule table or results HTML).', ['stage'])
+REQUEST_SECONDS = metrics.histogram('scheduler_http_request_seconds', 'Time to handle an HTTP request.', ['endpoint', 'method'])
+SOLVER_STEPS = metrics.counter('scheduler_solver_steps_total', 'Annealing steps run.')
+SOLVER_PHASE_SECONDS = metrics.counter('scheduler_solver_phase_seconds_total',
+                                       'Annealing time by phase: neighbour generation, energy evaluation, commit.', ['phase'])
+SOLVER_MOVES = metrics.counter('scheduler_solver_moves_total', 'Proposed and accepted annealing moves by type.', ['move', 'outcome'])
+SOLVER_STEPS_PER_SECOND = metrics.gauge('scheduler_solver_steps_per_second', 'Annealing speed of the last finished solve.')
+SOLVER_LAST_ENERGY = metrics.gauge('scheduler_solver_last_energy', 'Energy breakdown of the last finished solve.', ['component'])
+SOLVER_LAST_GAP = metrics.gauge('scheduler_solver_last_gap', 'Energy minus lower bound of the last finished solve.')
+RESULT_CACHE_LOOKUPS = metrics.counter('scheduler_result_cache_lookups_total', 'Result cache lookups.', ['outcome'])
+JOBS = metrics.gauge('scheduler_jobs', 'Known background jobs by status.', ['status'])
+ENERGY_CACHE_STATS = metrics.gauge('scheduler_energy_cache', 'Energy cache hits, misses and size.', ['stat'])
+
+
+@metrics.on_collect
+def collect_state_metrics():
+    for status, count in job_queue.counts().items():
+        JOBS.set(count, status=status)
+    if energy_cache is not None:
+        cache_stats = energy_cache.stats()
+        for stat in ('hits', 'misses', 'size'):
+            ENERGY_CACHE_STATS.set(cache_stats[stat], stat=stat)
+
+
+def record_solver_stats(stats):
+    """Adds the stats dict filled by make_schedule to the solver metrics."""
+    SOLVE_SECONDS.observe(stats.get('seconds', 0.0), solver=stats.get('solver', 'anneal'))
+    if stats.get('solver') == 'anneal':
+        SOLVER_STEPS.inc(stats['steps'])
+        SOLVER_STEPS_PER_SECOND.set(stats['steps_per_second'])
+        for phase in ('neighbour', 'energy', 'commit'):
+            SOLVER_PHASE_SECONDS.inc(stats[phase + '_seconds'], phase=phase)
+        for move, counts in stats['moves'].items():
+            SOLVER_MOVES.inc(counts['proposed'], move=move, outcome='proposed')
+            SOLVER_MOVES.inc(counts['accepted'], move=move, outcome='accepted')
+    SOLVER_LAST_ENERGY.set(stats['energy'], component='Total')
+    SOLVER_LAST_GAP.set(stats['gap'])
+    for component, value in stats['breakdown'].items():
+        SOLVER_LAST_ENERGY.set(value, component=component)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_time(response):
+    elapsed = time.perf_counter() - g.get('request_start', time.perf_counter())
+    REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or 'unknown', method=request.method)
+    if app.config['TIMING_LOG']:
+        app.logger.info("%s %s -> %s in %.1f ms", request.method, request.path, response.status_code, elapsed * 1000)
+    return response
+
+
 def parse_text_list(text_input):
     """Helper to parse comma-separated numbers from an entry box."""
     if not text_input:
@@ -124,6 +332,29 @@ HTML_TEMPLATE = """
         .btn-submit:hover {
             background-color: #005bb5;
         }
+        .btn-secondary {
+            padding: 10px 20px;
+            background-color: #ffffff;
+            color: #007aff;
+            border: 1px solid #007aff;
+            border-radius: 5px;
+            font-size: 1rem;
+            cursor: pointer;
+        }
+        .btn-cancel {
+            padding: 8px 16px;
+            background-color: #ffffff;
+            color: #602020;
+            border: 1px solid #d0a0a0;
+            border-radius: 5px;
+            cursor: pointer;
+        }
+        .job-status {
+            background: #f8f9fa;
+            border: 1px solid #e0e0e0;
+            border-radius: 8px;
+            padding: 20px;
+        }
         
         /* Flashed messages (errors/success) */
         .flash {
@@ -245,7 +476,7 @@ HTML_TEMPLATE = """
                         {% endif %}
                     {% endwith %}
 
-                    {% if session.get('active_file_short') %}
+                    {% if session.get('matrix_key') and session.get('active_file_short') %}
                     <div class="file-status">
                         <strong>Active File:</strong> {{ session['active_file_short'] }}
                         <br><small>Re-upload only if you want to change this.</small>
@@ -280,8 +511,8 @@ HTML_TEMPLATE = """
                     <div class="form-group">
                         <label>Ignore Actors</label>
                         <div class="actor-list">
-                            {% if session.get('actors_list') %}
-                                {% for actor in session['actors_list'] %}
+                            {% if actors_list %}
+                                {% for actor in actors_list %}
                                 <label>
                                     <input type="checkbox" name="ignore_actors" value="{{ actor }}"
                                     {% if actor in (request.form.getlist('ignore_actors') or []) %} checked {% endif %}>
@@ -294,43 +525,32 @@ HTML_TEMPLATE = """
                         </div>
                     </div>
 
+                    <div class="form-group">
+                        <label for="seed">Random Seed (optional)</label>
+                        <input type="number" name="seed" id="seed" value="{{ request.form.get('seed', '') }}" step="1">
+                    </div>
+
                     <button type="submit" class="btn-submit">Generate Schedule</button>
+                    <button type="submit" name="reoptimize" value="1" class="btn-secondary"
+                            title="Ignore stored results for these inputs and search again">Re-optimize</button>
                 </form>
             </div>
 
             <div class="results-container">
-                {% if results %}
-                    <div class="summary-box">
-                        <h3>Summary</h3>
-                        <p><strong>Suggested Scene Order:</strong> {{ results.scenes }}</p>
-                        
-                        {% if results.breakdown and 'Total Time (min)' in results.breakdown %}
-                            <p><strong>Total Rehearsal Time:</strong> {{ "%.1f"|format(results.breakdown["Total Time (min)"] / 60) }} hours ({{ "%.0f"|format(results.breakdown["Total Time (min)"]) }} min)</p>
-                        {% endif %}
-                        <p><strong>Schedule Quality (Total): {{ "%.0f"|format(results.energy) }}</strong></p>
-                        <ul>
-                            <li style="color: #444;">(Breakdown of score, lower is better)</li>
-                            {% if results.breakdown %}
-                                {% for key, value in results.breakdown.items() %}
-                                    {% if key != 'Total Time (min)' %} 
-                                        {% if value > 0 %}
-                                            <li style="color: #b22222;">
-                                                <strong>{{ key }}: {{ "%.0f"|format(value) }}</strong>
-                                            </li>
-                                        {% else %}
-                                            <li>{{ key }}: 0</li>
-                                        {% endif %}
-                                    {% endif %}
-                                {% endfor %}
-                            {% endif %}
-                        </ul>
-                        
-                        <p><strong>Ignored Actors:</strong> {{ results.ignored_actors_str }}</p>
-                        <p><strong>Ignored Scenes:</strong> {{ results.ignored_scenes_str }}</p>
-                    </div>
-                    
-                    <div class="schedule-table-wrapper">
-                        {{ results.table | safe }}
+                {% if results_html %}
+                    {{ results_html | safe }}
+                {% elif job %}
+                    <div class="job-status" id="job-status"
+                         data-status-url="{{ url_for('job_status', job_id=job.id) }}"
+                         data-events-url="{{ url_for('job_events', job_id=job.id) }}"
+                         data-finish-url="{{ url_for('job_finish', job_id=job.id) }}"
+                         data-cancel-url="{{ url_for('job_cancel', job_id=job.id) }}">
+                        <p id="job-message">Your schedule is queued...</p>
+                        <progress id="job-progress" max="1" value="0"></progress>
+                        <p id="job-best"></p>
+                        <button type="button" class="btn-secondary" id="job-finish">Good enough, finish now</button>
+                        <button type="button" class="btn-cancel" id="job-cancel">Cancel</button>
+                        <noscript><a href="{{ url_for('index', job=job.id) }}">Check the result</a></noscript>
                     </div>
                 {% else %}
                     <p>Upload a file and click "Generate Schedule" to see results here.</p>
@@ -338,13 +558,288 @@ HTML_TEMPLATE = """
             </div>
         </div>
     </div>
+    <script>
+    // Poll the background job until the schedule is ready
+    (function () {
+        var box = document.getElementById('job-status');
+        if (!box) { return; }
+        var message = document.getElementById('job-message');
+        var cancel = document.getElementById('job-cancel');
+        var finishNow = document.getElementById('job-finish');
+        var progressBar = document.getElementById('job-progress');
+        var best = document.getElementById('job-best');
+
+        function finish(text, category) {
+            var div = document.createElement('div');
+            div.className = category ? 'flash ' + category : '';
+            div.textContent = text;
+            box.replaceChildren(div);
+        }
+
+        function showProgress(p) {
+            message.textContent = 'Generating schedule... step ' + p.step + ' of ' + p.step_max +
+                ' (acceptance ' + Math.round(p.acceptance_rate * 100) + '%)';
+            progressBar.value = p.step / p.step_max;
+            best.textContent = 'Best so far: ' + Math.round(p.best_energy) +
+                ' with scenes ' + p.best_state.join(', ');
+        }
+
+        function poll() {
+            fetch(box.dataset.statusUrl).then(function (r) { return r.json(); }).then(function (job) {
+                if (job.status === 'done') {
+                    box.parentNode.innerHTML = job.html;
+                } else if (job.status === 'failed') {
+                    finish('An error occurred: ' + job.error, 'error');
+                } else if (job.status === 'cancelled') {
+                    finish('Schedule generation was cancelled.');
+                } else {
+                    if (job.status === 'running' && job.progress) {
+                        showProgress(job.progress);
+                    } else {
+                        message.textContent = job.status === 'running'
+                            ? 'Generating schedule...'
+                            : 'Your schedule is queued (' + job.position + ' ahead of you)...';
+                    }
+                    setTimeout(poll, 1000);
+                }
+            }).catch(function () { setTimeout(poll, 3000); });
+        }
+
+        function listen() {
+            // Live progress over Server-Sent Events, polling as a fallback
+            if (!window.EventSource) { poll(); return; }
+            var events = new EventSource(box.dataset.eventsUrl);
+            events.addEventListener('progress', function (e) { showProgress(JSON.parse(e.data)); });
+            events.addEventListener('end', function () { events.close(); poll(); });
+            events.onerror = function () { events.close(); poll(); };
+        }
+
+        finishNow.addEventListener('click', function () {
+            finishNow.disabled = true;
+            fetch(box.dataset.finishUrl, {method: 'POST'});
+        });
+        cancel.addEventListener('click', function () {
+            cancel.disabled = true;
+            fetch(box.dataset.cancelUrl, {method: 'POST'});
+        });
+        listen();
+    })();
+    </script>
 </body>
 </html>
 """
 
+# --- Results (rendered into the page, or returned by the job status endpoint) ---
+RESULTS_TEMPLATE = """
+<div class="summary-box">
+    <h3>Summary</h3>
+    {% if results.cached %}
+        <p><em>Same inputs as an earlier run, so this is the stored schedule. Use "Re-optimize" for a fresh attempt.</em></p>
+    {% elif results.warm_start %}
+        <p><em>Refined from your previous schedule. Use "Re-optimize" for a fresh attempt.</em></p>
+    {% endif %}
+    <p><strong>Suggested Scene Order:</strong> {{ results.scenes }}</p>
+    {% if results.dropped_includes %}
+        <p style="color: #b22222;">Could not include scene(s) {{ results.dropped_includes }}: they are avoided or need an ignored actor.</p>
+    {% endif %}
+    
+    {% if results.breakdown and 'Total Time (min)' in results.breakdown %}
+        <p><strong>Total Rehearsal Time:</strong> {{ "%.1f"|format(results.breakdown["Total Time (min)"] / 60) }} hours ({{ "%.0f"|format(results.breakdown["Total Time (min)"]) }} min)</p>
+    {% endif %}
+    <p><strong>Schedule Quality (Total): {{ "%.0f"|format(results.energy) }}</strong></p>
+    {% if results.lower_bound is not none %}
+        <p>No schedule can score below {{ "%.0f"|format(results.lower_bound) }}
+            {% if results.gap <= 0 %}(this one is optimal){% else %}(gap {{ "%.0f"|format(results.gap) }}){% endif %}</p>
+    {% endif %}
+    <ul>
+        <li style="color: #444;">(Breakdown of score, lower is better)</li>
+        {% if results.breakdown %}
+            {% for key, value in results.breakdown.items() %}
+                {% if key != 'Total Time (min)' %} 
+                    {% if value > 0 %}
+                        <li style="color: #b22222;">
+                            <strong>{{ key }}: {{ "%.0f"|format(value) }}</strong>
+                        </li>
+                    {% else %}
+                        <li>{{ key }}: 0</li>
+                    {% endif %}
+                {% endif %}
+            {% endfor %}
+        {% endif %}
+    </ul>
+    
+    <p><strong>Ignored Actors:</strong> {{ results.ignored_actors_str }}</p>
+    <p><strong>Ignored Scenes:</strong> {{ results.ignored_scenes_str }}</p>
+</div>
+
+<div class="schedule-table-wrapper">
+    {{ results.table | safe }}
+</div>
+"""
+
+
+def render_results(results):
+    start = time.perf_counter()
+    html = render_template_string(RESULTS_TEMPLATE, results=results)
+    RENDER_SECONDS.observe(time.perf_counter() - start, stage='results')
+    return html
+
+
+def render_page(**context):
+    """Renders the main page; the actor list comes from the stored matrix."""
+    meta = matrix_store.get_meta(session.get('matrix_key'))
+    actors_list = meta[0] if meta else []
+    return render_template_string(HTML_TEMPLATE, actors_list=actors_list, **context)
+
+
+def get_client_id():
+    """Stable per-browser id, used as the owner of background jobs."""
+    if 'client_id' not in session:
+        session['client_id'] = uuid.uuid4().hex
+    return session['client_id']
+
+
+def run_schedule_job(schedule_args, ignored_actor_names, avoid_scenes, seed=None, cache_key=None, queued_at=None,
+                     session_key=None, initial_state=None, stop_event=None, progress_callback=None):
+    """Runs one solve in a job worker and returns the results dict for RESULTS_TEMPLATE.
+
+    With initial_state (the session's last best order) the anneal is the
+    short SOLVER_WARM one starting there. The best order is stored under
+    session_key, a (client_id, matrix_key) pair, for the next warm start.
+    """
+    def report_progress(progress):
+        # 1-based scene order for display
+        progress_callback(dict(progress, best_state=[s + 1 for s in progress["best_state"]]))
+
+    queue_wait = time.time() - queued_at if queued_at is not None else 0.0
+    QUEUE_WAIT_SECONDS.observe(queue_wait)
+    warm = initial_state is not None
+    SOLVE_STARTS.inc(start='warm' if warm else 'cold')
+    solver_stats = {}
+    best_state, best_energy, call_times, nr_calls, energy_breakdown = make_schedule(
+        **schedule_args,
+        seed=seed,
+        n_chains=app.config['SOLVER_CHAINS'],
+        n_workers=app.config['SOLVER_WORKERS'],
+        solver=app.config['SOLVER_MODE'],
+        energy_cache=energy_cache,
+        **(app.config['SOLVER_WARM'] if warm else app.config['SOLVER_ANNEAL']),
+        initial_state=initial_state,
+        stop_event=stop_event,
+        progress_callback=report_progress if progress_callback else None,
+        stats=solver_stats
+    )
+    record_solver_stats(solver_stats)
+    if session_key is not None:
+        last_schedules.put(*session_key, best_state)
+    
+    # --- Format results for display ---
+    render_start = time.perf_counter()
+    schedule_table = schedule_table_html(
+        scene_matrix=schedule_args['sa_matrix'],
+        name_list=schedule_args['actors_list'],
+        scene_time=schedule_args['scene_time'],
+        selected_scenes=best_state, # Pass 0-indexed state
+        actors_to_ignore=schedule_args['actors_to_ignore'] # Pass 1-based indices
+    )
+    
+    results = {
+        "scenes": ", ".join([str(s + 1) for s in best_state]),
+        "energy": best_energy,
+        "table": schedule_table,
+        "ignored_actors_str": ", ".join(ignored_actor_names) if ignored_actor_names else "None",
+        "ignored_scenes_str": ", ".join(map(str, avoid_scenes)) if avoid_scenes else "None",
+        "breakdown": energy_breakdown,
+        "lower_bound": solver_stats['lower_bound'],
+        "gap": solver_stats['gap'],
+        "dropped_includes": ", ".join(map(str, solver_stats['dropped_includes'])),
+        "warm_start": warm
+    }
+    render_seconds = time.perf_counter() - render_start
+    RENDER_SECONDS.observe(render_seconds, stage='table')
+    if app.config['TIMING_LOG']:
+        app.logger.info("solve: queue wait %.2f s, %s %s %.2f s (%d steps, %.0f steps/s), render %.1f ms",
+                        queue_wait, 'warm' if warm else 'cold', solver_stats['solver'], solver_stats['seconds'],
+                        solver_stats['steps'],
+                        solver_stats.get('steps_per_second', 0.0), render_seconds * 1000)
+    # A cancelled run only has a partial result, so it is not cached
+    if cache_key is not None and not (stop_event is not None and stop_event.is_set()):
+        result_cache.put(cache_key, results)
+    return results
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_queue.get(job_id, owner=get_client_id())
+    if job is None:
+        return jsonify({"error": "Unknown job."}), 404
+    payload = job.to_dict()
+    payload["position"] = job_queue.position(job)
+    if job.status == 'done':
+        payload["html"] = render_results(job.result)
+    return jsonify(payload)
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition of the solver and app metrics."""
+    return Response(metrics.render(), content_type=Registry.CONTENT_TYPE)
+
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-Sent Events: a `progress` event per solver report, then one `end` event."""
+    job = job_queue.get(job_id, owner=get_client_id())
+    if job is None:
+        return jsonify({"error": "Unknown job."}), 404
+
+    def stream():
+        version = -1
+        while True:
+            new_version = job.wait_for_change(version, timeout=15)
+            if new_version == version:
+                yield ": keep-alive\n\n"
+                continue
+            version = new_version
+            if not job.active:
+                yield f"event: end\ndata: {json.dumps({'status': job.status})}\n\n"
+                return
+            if job.progress is not None:
+                yield f"event: progress\ndata: {json.dumps(job.progress)}\n\n"
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/jobs/<job_id>/finish', methods=['POST'])
+def job_finish(job_id):
+    """Stop a running solve now and keep the best schedule found so far."""
+    job = job_queue.get(job_id, owner=get_client_id())
+    if job is None:
+        return jsonify({"error": "Unknown job."}), 404
+    job_queue.finish(job_id, owner=get_client_id())
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def job_cancel(job_id):
+    job = job_queue.get(job_id, owner=get_client_id())
+    if job is None:
+        return jsonify({"error": "Unknown job."}), 404
+    job_queue.cancel(job_id, owner=get_client_id())
+    return jsonify(job.to_dict())
+
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
-    results = None
+    job = None
+    results_html = None
+    
+    # Finished background job, e.g. /?job=<id> without JavaScript
+    if request.method == 'GET' and request.args.get('job'):
+        job = job_queue.get(request.args['job'], owner=get_client_id())
+        if job is not None and job.status == 'done':
+            results_html = render_results(job.result)
     
     if request.method == 'POST':
         # --- 1. Handle File Upload ---
@@ -353,23 +848,21 @@ def index():
         # Check if a new file was uploaded
         if file and file.filename:
             try:
-                # Clear old file if it exists
-                if 'active_file_path' in session and os.path.exists(session['active_file_path']):
-                    os.remove(session['active_file_path'])
-
                 filename = secure_filename(file.filename)
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+                file_path = os.path.join(app.config['UPLOAD_FOLDER'], uuid.uuid4().hex + '.csv')
                 file.save(file_path)
                 
-                # Load data to populate actor list
-                sa_matrix, actors_list, scene_time = load_data(file_path)
+                # Parse once and keep the parsed matrix in the store
+                parse_start = time.perf_counter()
+                try:
+                    sa_matrix, actors_list, scene_time = load_data(file_path, cache=False)
+                finally:
+                    os.remove(file_path)
+                CSV_PARSE_SECONDS.observe(time.perf_counter() - parse_start)
                 
-                # Store in session
-                session['active_file_path'] = file_path
+                # Store only the content key in the session
+                session['matrix_key'] = matrix_store.put(sa_matrix, actors_list, scene_time)
                 session['active_file_short'] = filename
-                session['actors_list'] = actors_list # For populating checkboxes
-                session['sa_matrix'] = sa_matrix.tolist() # Store as list
-                session['scene_time'] = scene_time # Store as list
                 
                 flash(f"Successfully uploaded '{filename}'.", 'success')
                 
@@ -380,27 +873,23 @@ def index():
                 
             except Exception as e:
                 flash(f"Error loading file: {e}", 'error')
-                session.pop('active_file_path', None)
+                session.pop('matrix_key', None)
                 session.pop('active_file_short', None)
-                session.pop('actors_list', None)
-                session.pop('sa_matrix', None)
-                session.pop('scene_time', None)
                 # This return IS correct, as a file error should
                 # stop the process.
-                return render_template_string(HTML_TEMPLATE)
+                return render_page()
 
         # --- 2. Check for Active File ---
-        if 'active_file_path' not in session or not os.path.exists(session['active_file_path']):
+        stored = matrix_store.get(session.get('matrix_key'))
+        if stored is None:
             flash("Please upload a CSV file first.", 'error')
-            return render_template_string(HTML_TEMPLATE)
+            return render_page()
             
         # --- 3. Run Scheduler (if file is active) ---
         # This block will now run on the *same* request as a file upload
         try:
-            # Load data from session
-            sa_matrix = np.array(session['sa_matrix'])
-            actors_list = session['actors_list']
-            scene_time = session['scene_time']
+            # Memory-mapped matrix from the store
+            sa_matrix, actors_list, scene_time = stored
 
             # Parse form inputs
             max_hours = float(request.form['max_hours'])
@@ -414,6 +903,12 @@ def index():
             if avoid_scenes is None:
                 raise ValueError("Invalid format for 'Scenes to Avoid'. Use comma-separated numbers.")
 
+            seed_text = request.form.get('seed', '').strip()
+            try:
+                seed = int(seed_text) if seed_text else None
+            except ValueError:
+                raise ValueError("Invalid format for 'Random Seed'. Use a whole number.")
+
             # Get ignored actors (names) from checkboxes
             ignored_actor_names = request.form.getlist('ignore_actors')
             
@@ -425,8 +920,9 @@ def index():
                     if name in actor_name_to_index:
                         actors_to_ignore_indices.append(actor_name_to_index[name])
 
-            # --- Run the algorithm ---
-            best_state, best_energy, call_times, nr_calls, energy_breakdown = make_schedule(
+            # --- Queue the algorithm ---
+            # The solve runs on the job pool; the page polls /jobs/<id>
+            schedule_args = dict(
                 max_hours=max_hours,
                 min_hours=min_hours,
                 sa_matrix=sa_matrix,
@@ -436,30 +932,27 @@ def index():
                 scenes_to_include=include_scenes,
                 scenes_to_avoid=avoid_scenes
             )
-            
-            # --- Format results for display ---
-            schedule_df = get_schedule_print(
-                scene_matrix=sa_matrix,
-                name_list=actors_list,
-                scene_time=scene_time,
-                selected_scenes=best_state, # Pass 0-indexed state
-                actors_to_ignore=actors_to_ignore_indices # Pass 1-based indices
-            )
-            
-            results = {
-                "scenes": ", ".join([str(s + 1) for s in best_state]),
-                "energy": best_energy,
-                "table": schedule_df.to_html(classes=["data-grid"], border=0),
-                "ignored_actors_str": ", ".join(ignored_actor_names) if ignored_actor_names else "None",
-                "ignored_scenes_str": ", ".join(map(str, avoid_scenes)) if avoid_scenes else "None",
-                "breakdown": energy_breakdown
-            }
+            # Identical inputs: show the stored result unless a re-optimize was asked for
+            cache_key = result_cache_key(session['matrix_key'], schedule_args, seed)
+            cached = None
+            if not request.form.get('reoptimize'):
+                cached = result_cache.get(cache_key)
+                RESULT_CACHE_LOOKUPS.inc(outcome='miss' if cached is None else 'hit')
+            if cached is not None:
+                results_html = render_results(dict(cached, cached=True))
+            else:
+                # An edit of an earlier run starts from its schedule; "Re-optimize" solves from scratch
+                session_key = (get_client_id(), session['matrix_key'])
+                initial_state = None if request.form.get('reoptimize') else last_schedules.get(*session_key)
+                job = job_queue.submit(get_client_id(), run_schedule_job, schedule_args, ignored_actor_names, avoid_scenes,
+                                       seed=seed, cache_key=cache_key, queued_at=time.time(),
+                                       session_key=session_key, initial_state=initial_state)
 
         except Exception as e:
             flash(f"An error occurred: {e}", 'error')
 
     # This renders the page for GET requests and after the POST logic is complete
-    return render_template_string(HTML_TEMPLATE, results=results)
+    return render_page(job=job, results_html=results_html)
 
 
 if __name__ == '__main__':
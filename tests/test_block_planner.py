@@ -0,0 +1,69 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_production
+from block_planner import BlockProblem, RehearsalDay, plan_block
+from make_schedule import shutdown_solver_pool
+
+
+@pytest.fixture(scope='module', autouse=True)
+def solver_pool():
+    yield
+    shutdown_solver_pool()
+
+
+def make_days(n_actors, seed):
+    rng = np.random.default_rng(seed)
+    days = []
+    for d in range(3):
+        unavailable = (rng.choice(n_actors, size=int(rng.integers(0, 3)), replace=False) + 1).tolist()
+        days.append(RehearsalDay(f"Day {d + 1}", max_hours=3, min_hours=1, unavailable_actors=unavailable))
+    return days
+
+
+def planned_scenes(plan):
+    return [scene for day in plan["days"] for scene in day["scenes"]]
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_every_placeable_scene_is_planned_once(seed):
+    sa_matrix, names, scene_time = generate_production(12, 6, seed=seed)
+    days = make_days(6, seed)
+    plan = plan_block(days, sa_matrix, scene_time, names, n_workers=2, seed=seed, step_max=300)
+    scenes = planned_scenes(plan)
+    assert len(scenes) == len(set(scenes))
+    assert sorted(scenes + plan["unplaceable"]) == list(range(1, 13))
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_unavailable_actors_never_rehearse_that_day(seed):
+    sa_matrix, names, scene_time = generate_production(12, 6, seed=seed)
+    days = make_days(6, seed)
+    plan = plan_block(days, sa_matrix, scene_time, names, n_workers=2, seed=seed, step_max=300)
+    for day, planned in zip(days, plan["days"]):
+        for scene in planned["scenes"]:
+            assert not any(sa_matrix[scene - 1][a - 1] for a in day.unavailable_actors)
+    for scene in plan["unplaceable"]:
+        assert all(any(sa_matrix[scene - 1][a - 1] for a in day.unavailable_actors) for day in days)
+
+
+def test_fixed_seed_gives_the_same_plan():
+    sa_matrix, names, scene_time = generate_production(12, 6, seed=3)
+    days = make_days(6, 3)
+    first = plan_block(days, sa_matrix, scene_time, names, n_workers=2, seed=7, step_max=300)
+    second = plan_block(days, sa_matrix, scene_time, names, n_workers=2, seed=7, step_max=300)
+    assert [day["scenes"] for day in first["days"]] == [day["scenes"] for day in second["days"]]
+    assert first["total_energy"] == second["total_energy"]
+
+
+def test_initial_assignment_handles_a_day_without_hours():
+    sa_matrix, names, scene_time = generate_production(8, 4, seed=0)
+    days = [RehearsalDay("Off", max_hours=0), RehearsalDay("On", max_hours=3)]
+    problem = BlockProblem(sa_matrix, scene_time, names, days)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assignment = problem.initial_assignment()
+    assert sorted(assignment[0] + assignment[1]) == list(range(8))
+    assert len(assignment[1]) > 0
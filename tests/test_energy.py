@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_production
+from make_schedule import energy_function, get_actor_call_times
+
+
+def reference_call_times(state, name_list, scene_time, sa_matrix):
+    # the original quadratic get_actor_call_times
+    n_actors = len(name_list)
+    nr_calls = [0]*len(state)
+    actor_call_time = [None]*n_actors
+    for actor_ix, actor in enumerate(sa_matrix.T):
+        attend = actor[state]
+        for i in range(1, len(attend)+1):
+            if (attend[0:i] == (i-1)*[0]+[1]).all():
+                actor_call_time[actor_ix] = i
+                nr_calls[i-1] += 1
+
+    call_time_dict = {}
+    len_state_scenes = list(np.array(scene_time)[state])
+    for ix, call_scene in enumerate(actor_call_time):
+        if call_scene:
+            call_time_dict[name_list[ix]] = sum(len_state_scenes[0:call_scene-1])
+    return call_time_dict, nr_calls
+
+
+def reference_energy(state, sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore, name_list, scenes_to_avoid_0idx):
+    # the original energy_function, with its per-actor loop
+    len_state_scenes = list(np.array(scene_time)[state])
+    total_time = sum(len_state_scenes)
+
+    actor_hard_constraint_penalty = 0
+    if actors_to_ignore:
+        state_matrix = sa_matrix[state, :]
+        actor_hard_constraint_penalty = np.sum(state_matrix[:, [a - 1 for a in actors_to_ignore]]) * 1000000
+
+    avoided_scene_penalty = 0
+    if scenes_to_avoid_0idx and state:
+        avoided_scene_penalty = len(set(state) & set(scenes_to_avoid_0idx)) * 1000000
+
+    max_time = max_hours*60
+    min_time = min_hours*60
+    time_constraint_penalty = 0
+    if total_time > max_time:
+        time_constraint_penalty = 1000 * (total_time - max_time)
+    if total_time < min_time:
+        time_constraint_penalty = 1000 * (min_time - total_time)
+
+    if not state:
+        return 999999 + time_constraint_penalty + actor_hard_constraint_penalty + avoided_scene_penalty, {}, [0]
+
+    total_wait_time = 0
+    short_work_penalty = 0
+    state_matrix = sa_matrix[state, :]
+    for actor_ix in range(sa_matrix.shape[1]):
+        if (actor_ix + 1) in actors_to_ignore:
+            continue
+        actor_schedule_in_state = state_matrix[:, actor_ix]
+        scenes_present_indices = np.where(actor_schedule_in_state == 1)[0]
+        if len(scenes_present_indices) == 0:
+            continue
+        first_scene_pos = scenes_present_indices[0]
+        last_scene_pos = scenes_present_indices[-1]
+        durations = len_state_scenes[first_scene_pos:last_scene_pos + 1]
+        total_actor_time_min = sum(durations)
+        actor_work_time_min = sum(np.array(durations) * actor_schedule_in_state[first_scene_pos:last_scene_pos + 1])
+        total_wait_time += total_actor_time_min - actor_work_time_min
+        if 0 < actor_work_time_min < 60:
+            short_work_penalty += 500
+
+    call_times, nr_calls = reference_call_times(state, name_list, scene_time, sa_matrix)
+    total_energy = (total_wait_time + sum(nr_calls) * 50 + time_constraint_penalty +
+                    actor_hard_constraint_penalty + avoided_scene_penalty + short_work_penalty)
+    return total_energy, call_times, nr_calls
+
+
+def random_instance(rng, max_scenes=25, max_actors=12):
+    n_scenes = int(rng.integers(1, max_scenes + 1))
+    n_actors = int(rng.integers(1, max_actors + 1))
+    sa_matrix, names, scene_time = generate_production(n_scenes, n_actors, seed=int(rng.integers(2**31)))
+    state = rng.permutation(n_scenes)[:int(rng.integers(0, n_scenes + 1))].tolist()
+    actors_to_ignore = (rng.choice(n_actors, size=int(rng.integers(0, min(n_actors, 2) + 1)), replace=False) + 1).tolist()
+    scenes_to_avoid_0idx = rng.choice(n_scenes, size=int(rng.integers(0, 3)), replace=True).tolist()
+    min_hours = int(rng.integers(0, 4))
+    max_hours = min_hours + int(rng.integers(0, 4))
+    return state, sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore, names, scenes_to_avoid_0idx
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_energy_function_matches_reference(seed):
+    args = random_instance(np.random.default_rng(seed))
+    energy, call_times, nr_calls, _ = energy_function(*args)
+    expected_energy, expected_call_times, expected_nr_calls = reference_energy(*args)
+    assert energy == expected_energy
+    assert call_times == expected_call_times
+    assert list(nr_calls) == expected_nr_calls
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_call_times_match_reference(seed):
+    state, sa_matrix, scene_time, _, _, _, names, _ = random_instance(np.random.default_rng(seed))
+    assert get_actor_call_times(state, names, scene_time, sa_matrix) == reference_call_times(state, names, scene_time, sa_matrix)
@@ -0,0 +1,36 @@
+import numpy as np
+
+from make_schedule import EnergyCache
+
+
+def test_hits_and_misses_are_counted():
+    cache = EnergyCache(maxsize=4)
+    problem_key = EnergyCache.problem_key(np.eye(3, dtype=int), [10, 20, 30], 2, 1, [], [])
+    key = cache.key([0, 2], problem_key)
+    assert cache.get(key) is None
+    cache.put(key, 123)
+    assert cache.get(key) == 123
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1, "maxsize": 4, "hit_rate": 0.5}
+    cache.clear()
+    assert cache.stats()["size"] == 0 and cache.hits == cache.misses == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = EnergyCache(maxsize=2)
+    cache.put(b'a', 1)
+    cache.put(b'b', 2)
+    assert cache.get(b'a') == 1  # a is now the most recently used
+    cache.put(b'c', 3)
+    assert cache.get(b'b') is None
+    assert cache.get(b'a') == 1 and cache.get(b'c') == 3
+    assert cache.stats()["size"] == 2
+
+
+def test_keys_depend_on_state_and_problem():
+    sa_matrix = np.eye(3, dtype=int)
+    key_a = EnergyCache.problem_key(sa_matrix, [10, 20, 30], 2, 1, [], [])
+    key_b = EnergyCache.problem_key(sa_matrix, [10, 20, 30], 3, 1, [], [])
+    cache = EnergyCache()
+    assert key_a != key_b
+    assert cache.key([0, 1], key_a) != cache.key([1, 0], key_a)
+    assert cache.key([0, 1], key_a) != cache.key([0, 1], key_b)
@@ -0,0 +1,57 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_production
+from make_schedule import energy_function, energy_function_batch, make_schedule, solve_exact
+
+
+def brute_force(sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore, scenes_to_include_0idx, scenes_to_avoid_0idx):
+    # least energy over every order of every allowed scene set with the included scenes
+    allowed = [s for s in range(len(sa_matrix)) if s not in scenes_to_avoid_0idx]
+    optional = [s for s in allowed if s not in scenes_to_include_0idx]
+    states = []
+    for k in range(len(optional) + 1):
+        for subset in itertools.combinations(optional, k):
+            states.extend(list(order) for order in itertools.permutations(list(scenes_to_include_0idx) + list(subset)))
+    return energy_function_batch(states, sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore,
+                                 scenes_to_avoid_0idx).min()
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_solve_exact_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n_scenes = int(rng.integers(1, 9))
+    n_actors = int(rng.integers(1, 7))
+    sa_matrix, names, scene_time = generate_production(n_scenes, n_actors, seed=seed)
+    actors_to_ignore = [int(a) + 1 for a in rng.choice(n_actors, size=int(rng.integers(0, min(n_actors, 2) + 1)), replace=False)]
+    scenes_to_avoid_0idx = rng.choice(n_scenes, size=int(rng.integers(0, min(n_scenes, 2) + 1)), replace=False).tolist()
+    scenes_to_include_0idx = [s for s in rng.choice(n_scenes, size=int(rng.integers(0, min(n_scenes, 2) + 1)), replace=False).tolist()
+                              if s not in scenes_to_avoid_0idx]
+    min_hours = int(rng.integers(0, 3))
+    max_hours = min_hours + int(rng.integers(0, 3))
+    args = (sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore, scenes_to_include_0idx, scenes_to_avoid_0idx)
+
+    state, proven = solve_exact(*args)
+    assert proven
+    assert set(scenes_to_include_0idx) <= set(state)
+    assert not set(scenes_to_avoid_0idx) & set(state)
+    energy = energy_function(state, sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore, names,
+                             scenes_to_avoid_0idx)[0]
+    assert energy == brute_force(*args)
+
+
+def test_exact_solver_refuses_large_productions():
+    sa_matrix, _, scene_time = generate_production(40, 10, seed=0)
+    with pytest.raises(ValueError):
+        solve_exact(sa_matrix, scene_time, 4, 2, [], [], [])
+
+
+def test_exact_mode_anneals_large_productions():
+    sa_matrix, names, scene_time = generate_production(40, 10, seed=0)
+    stats = {}
+    state, energy, _, _, _ = make_schedule(4, 2, sa_matrix, scene_time, names, [], [], [], solver='exact',
+                                           seed=0, step_max=500, stats=stats)
+    assert stats['solver'] == 'anneal'
+    assert state and energy < 999999
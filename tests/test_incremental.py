@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_production
+from make_schedule import (IncrementalEnergy, MoveGenerator, SolverRandom, apply_move, energy_function,
+                           propose_move)
+
+
+def random_problem(seed):
+    rng = np.random.default_rng(seed)
+    n_scenes = int(rng.integers(2, 20))
+    n_actors = int(rng.integers(1, 10))
+    sa_matrix, names, scene_time = generate_production(n_scenes, n_actors, seed=seed)
+    actors_to_ignore = [int(a) + 1 for a in rng.choice(n_actors, size=min(n_actors, int(rng.integers(0, 3))), replace=False)]
+    scenes_to_avoid_0idx = rng.choice(n_scenes, size=int(rng.integers(0, 3)), replace=False).tolist()
+    scenes_to_include_0idx = [s for s in rng.choice(n_scenes, size=2, replace=False).tolist() if s not in scenes_to_avoid_0idx]
+    min_hours = int(rng.integers(0, 3))
+    max_hours = min_hours + int(rng.integers(0, 3))
+    state = rng.permutation(n_scenes)[:int(rng.integers(0, n_scenes + 1))].tolist()
+    return (state, sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore, names,
+            scenes_to_avoid_0idx, scenes_to_include_0idx)
+
+
+def walk(seed, propose, n_steps=150):
+    # scores every proposed move both ways and takes about half of them
+    (state, sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore, names,
+     scenes_to_avoid_0idx, scenes_to_include_0idx) = random_problem(seed)
+    rng = SolverRandom(seed)
+    evaluator = IncrementalEnergy(state, sa_matrix, scene_time, max_hours, min_hours, actors_to_ignore,
+                                  scenes_to_avoid_0idx)
+    generator = MoveGenerator(state, len(sa_matrix), scenes_to_avoid_0idx, scenes_to_include_0idx, rng=rng)
+    seen = set()
+    for _ in range(n_steps):
+        move = propose(evaluator.state, generator, sa_matrix, scenes_to_avoid_0idx, scenes_to_include_0idx, rng)
+        expected = energy_function(apply_move(evaluator.state, move), sa_matrix, scene_time, max_hours, min_hours,
+                                   actors_to_ignore, names, scenes_to_avoid_0idx)[0]
+        assert evaluator.move_energy(move) == expected, move
+        if move is not None:
+            seen.add(move[0])
+        if rng.random() < 0.5:
+            generator.commit(evaluator.state, move)
+            evaluator.commit(move)
+            assert evaluator.energy == expected
+    return seen
+
+
+def generator_move(state, generator, sa_matrix, scenes_to_avoid_0idx, scenes_to_include_0idx, rng):
+    return generator.propose(state)
+
+
+def basic_move(state, generator, sa_matrix, scenes_to_avoid_0idx, scenes_to_include_0idx, rng):
+    return propose_move(state, scenes_to_avoid_0idx, scenes_to_include_0idx, sa_matrix, rng=rng)
+
+
+@pytest.mark.parametrize('seed', range(60))
+def test_move_energy_matches_energy_function(seed):
+    walk(seed, generator_move)
+    walk(seed, basic_move)
+
+
+def test_every_move_type_is_checked():
+    seen = set()
+    for seed in range(20):
+        seen |= walk(seed, generator_move)
+    assert seen == set(MoveGenerator.OPERATORS)
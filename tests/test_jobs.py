@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+
+from schedule_jobs import JobQueue, QueueFullError
+
+
+def wait_for_stop(started, result='partial', stop_event=None, progress_callback=None):
+    # stands in for a solve: runs until asked to stop, then returns its best result
+    started.set()
+    progress_callback({"step": 1})
+    stop_event.wait(5)
+    return result
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def queue():
+    queues = []
+
+    def make(**kwargs):
+        queues.append(JobQueue(**kwargs))
+        return queues[-1]
+    yield make
+    for q in queues:
+        q.shutdown()
+
+
+def test_finish_keeps_the_partial_result(queue):
+    q = queue(n_workers=2)
+    started = threading.Event()
+    job = q.submit('a', wait_for_stop, started)
+    assert started.wait(5)
+    assert job.status == 'running' and job.progress == {"step": 1}
+    assert q.finish(job.id)
+    wait_until(lambda: not job.active)
+    assert job.status == 'done' and job.result == 'partial'
+
+
+def test_cancel_running_job_drops_its_result(queue):
+    q = queue(n_workers=2)
+    started = threading.Event()
+    job = q.submit('a', wait_for_stop, started)
+    assert started.wait(5)
+    assert q.cancel(job.id)
+    wait_until(lambda: not job.active)
+    assert job.status == 'cancelled' and job.result is None
+    assert not q.cancel(job.id)
+
+
+def test_cancel_queued_job_never_runs_it(queue):
+    q = queue(n_workers=1)
+    first_started, second_started = threading.Event(), threading.Event()
+    first = q.submit('a', wait_for_stop, first_started)
+    assert first_started.wait(5)
+    second = q.submit('b', wait_for_stop, second_started)
+    third = q.submit('c', wait_for_stop, threading.Event())
+    assert second.status == 'queued' and q.position(second) == 0 and q.position(third) == 1
+    assert q.cancel(second.id)
+    assert q.position(third) == 0
+    assert second.status == 'cancelled'
+    q.finish(first.id)
+    wait_until(lambda: not first.active)
+    time.sleep(0.05)
+    assert not second_started.is_set()
+
+
+def test_jobs_of_other_owners_are_hidden(queue):
+    q = queue(n_workers=2)
+    job = q.submit('a', wait_for_stop, threading.Event())
+    assert q.get(job.id, owner='b') is None
+    assert not q.cancel(job.id, owner='b') and not q.finish(job.id, owner='b')
+    assert q.get(job.id, owner='a') is job
+
+
+def test_max_per_owner(queue):
+    q = queue(n_workers=2, max_per_owner=1)
+    q.submit('a', wait_for_stop, threading.Event())
+    with pytest.raises(QueueFullError):
+        q.submit('a', wait_for_stop, threading.Event())
+    q.submit('b', wait_for_stop, threading.Event())
+
+
+def test_max_queued(queue):
+    q = queue(n_workers=1, max_queued=2)
+    q.submit('a', wait_for_stop, threading.Event())
+    q.submit('b', wait_for_stop, threading.Event())
+    with pytest.raises(QueueFullError):
+        q.submit('c', wait_for_stop, threading.Event())
+    assert q.counts()['queued'] + q.counts()['running'] == 2
+
+
+def test_one_owner_cannot_hold_every_worker():
+    with pytest.raises(ValueError):
+        JobQueue(n_workers=2, max_per_owner=2)
+    with pytest.raises(ValueError):
+        JobQueue(n_workers=2, max_per_owner=0)
+    JobQueue(n_workers=1, max_per_owner=1).shutdown()
+
+
+def test_finished_jobs_are_pruned_after_keep_seconds(queue):
+    q = queue(n_workers=2, keep_seconds=0.05)
+    started = threading.Event()
+    job = q.submit('a', wait_for_stop, started)
+    assert started.wait(5)
+    q.finish(job.id)
+    wait_until(lambda: not job.active)
+    assert q.get(job.id) is job
+    time.sleep(0.1)
+    q.submit('b', wait_for_stop, threading.Event())  # pruning happens on submit
+    assert q.get(job.id) is None
+
+
+def test_failed_job_keeps_its_error(queue):
+    q = queue(n_workers=2)
+
+    def fail(stop_event=None, progress_callback=None):
+        raise RuntimeError("boom")
+    job = q.submit('a', fail)
+    wait_until(lambda: not job.active)
+    assert job.status == 'failed' and job.error == "boom"
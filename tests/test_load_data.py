@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pytest
+
+from make_schedule import load_cache_path, load_data
+
+pd = pytest.importorskip('pandas')
+
+CASES = {
+    'plain': "Scene,A,B\n10,1,0\n20,0,1\n",
+    'bom': "﻿Scene,A,B\n10,1,0\n20,0,1\n",
+    'na_tokens': "Scene,A,B,C,D\n10,NA,1,,null\n20,nan,N/A,1,#N/A\n",
+    'short_row': "Scene,A,B,C\n10,1\n20,1,1,1\n",
+    'implicit_index': "A,B\n10,1,0\n20,0,1\n",
+    'duplicate_headers': "Scene,A,A,B\n10,1,0,1\n20,0,1,1\n",
+    'unnamed_headers': "Scene,,B,\n10,1,0,1\n",
+    'trailing_comma': "Scene,A,B,\n10,1,0,\n20,0,1,\n",
+    'trailing_comma_rows_only': "Scene,A,B\n10,1,0,\n20,0,1,\n",
+    'floats': "Scene,A,B\n10.0,1.0,0\n20,0.0,1\n",
+    'padded_cells': "Scene,A,B\n10, 1 ,0\n20,0,1\n",
+    'blank_line': "Scene,A,B\n10,1,0\n\n20,0,1\n",
+    'whitespace_line': "Scene,A,B\n10,1,0\n   \n20,0,1\n",
+    'crlf': "Scene,A,B\r\n10,1,0\r\n20,0,1\r\n",
+    'header_only': "Scene,A,B\n",
+}
+
+
+def write_csv(tmp_path, text, name='production.csv'):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8', newline='')
+    return str(path)
+
+
+def pandas_load(path):
+    # the loader load_data replaced
+    df = pd.read_csv(path, index_col=0, header=0).fillna(0)
+    return df.to_numpy().astype(int), list(df.columns), [int(t) for t in df.index]
+
+
+@pytest.mark.parametrize('name', CASES)
+def test_load_data_matches_pandas(tmp_path, name):
+    path = write_csv(tmp_path, CASES[name])
+    expected_matrix, expected_names, expected_times = pandas_load(path)
+    sa_matrix, actor_names, scene_times = load_data(path, cache=False)
+    assert sa_matrix.shape == expected_matrix.shape
+    assert np.array_equal(sa_matrix, expected_matrix)
+    assert list(actor_names) == expected_names
+    assert list(scene_times) == expected_times
+
+
+def test_empty_file_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="empty"):
+        load_data(write_csv(tmp_path, ""), cache=False)
+
+
+def test_too_long_row_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Expected 3 fields in line 3, saw 5"):
+        load_data(write_csv(tmp_path, "Scene,A,B\n10,1,0\n20,0,1,1,1\n"), cache=False)
+
+
+def test_non_numeric_scene_time_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="non-numeric"):
+        load_data(write_csv(tmp_path, "Scene,A,B\nten,1,0\n"), cache=False)
+
+
+def test_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_data(str(tmp_path / 'missing.csv'))
+
+
+def test_cache_round_trip(tmp_path):
+    path = write_csv(tmp_path, "Scene,Ann,Bob,Bob\n10,1,0,1\n25,0,1,1\n")
+    parsed = load_data(path)
+    assert os.path.exists(load_cache_path(path))
+    cached = load_data(path)
+    assert cached[0].dtype == parsed[0].dtype == np.uint8
+    assert np.array_equal(cached[0], parsed[0])
+    assert list(cached[1]) == list(parsed[1]) == ['Ann', 'Bob', 'Bob.1']
+    assert list(cached[2]) == list(parsed[2]) == [10, 25]
+
+
+def test_cache_is_used_while_the_csv_is_unchanged(tmp_path):
+    path = write_csv(tmp_path, "Scene,A,B\n10,1,0\n")
+    load_data(path)
+    # a cache that differs from the CSV shows it was read instead of the CSV
+    stat = os.stat(path)
+    with np.load(load_cache_path(path)) as cached:
+        arrays = dict(cached)
+    np.savez(load_cache_path(path), **{**arrays, 'scene_time': np.array([99])})
+    assert load_data(path)[2] == [99]
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert load_data(path)[2] == [10]
+
+
+def test_cache_is_invalidated_by_a_size_change(tmp_path):
+    path = write_csv(tmp_path, "Scene,A,B\n10,1,0\n")
+    load_data(path)
+    stat = os.stat(path)
+    write_csv(tmp_path, "Scene,A,B\n10,1,0\n20,0,1\n")
+    # same modification time, so only the size tells the files apart
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    sa_matrix, _, scene_times = load_data(path)
+    assert scene_times == [10, 20] and sa_matrix.shape == (2, 2)
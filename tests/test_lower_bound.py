@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_production
+from make_schedule import compile_problem, lower_bound, make_schedule
+
+
+def random_case(seed):
+    rng = np.random.default_rng(seed)
+    n_scenes = int(rng.integers(1, 11))
+    n_actors = int(rng.integers(1, 8))
+    sa_matrix, names, scene_time = generate_production(n_scenes, n_actors, seed=seed)
+    if seed % 4 == 0:
+        # minutes that are not whole take the bound's fallback path
+        scene_time = [t + 0.5 for t in scene_time]
+    actors_to_ignore = [int(a) + 1 for a in rng.choice(n_actors, size=int(rng.integers(0, min(n_actors, 2) + 1)), replace=False)]
+    scenes_to_include = (rng.choice(n_scenes, size=int(rng.integers(0, min(n_scenes, 3) + 1)), replace=False) + 1).tolist()
+    scenes_to_avoid = (rng.choice(n_scenes, size=int(rng.integers(0, min(n_scenes, 2) + 1)), replace=False) + 1).tolist()
+    min_hours = float(rng.integers(0, 4)) / 2
+    max_hours = min_hours + float(rng.integers(0, 4)) / 2
+    return max_hours, min_hours, sa_matrix, scene_time, names, actors_to_ignore, scenes_to_include, scenes_to_avoid
+
+
+@pytest.mark.parametrize('seed', range(120))
+def test_lower_bound_never_exceeds_optimum(seed):
+    max_hours, min_hours, sa_matrix, scene_time, names, actors_to_ignore, scenes_to_include, scenes_to_avoid = random_case(seed)
+    problem = compile_problem(sa_matrix, scene_time, actors_to_ignore, scenes_to_include, scenes_to_avoid)
+    _, optimum, _, _, _ = make_schedule(max_hours, min_hours, sa_matrix, scene_time, names, actors_to_ignore,
+                                        scenes_to_include, scenes_to_avoid, solver='exact', problem=problem)
+    assert lower_bound(problem, max_hours, min_hours) <= optimum + 1e-9
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_production
+from make_schedule import compile_problem, make_schedule
+
+
+def test_caller_arrays_stay_writable():
+    sa_matrix, names, scene_time = generate_production(12, 5, seed=0)
+    scene_time = np.array(scene_time)
+    make_schedule(4, 2, sa_matrix, scene_time, names, [1], [2], [3], seed=0, step_max=200)
+    assert sa_matrix.flags.writeable and scene_time.flags.writeable
+    sa_matrix[0, 0] = 1
+    scene_time[0] = 10
+
+
+def test_problem_arrays_are_read_only():
+    sa_matrix, _, scene_time = generate_production(12, 5, seed=0)
+    problem = compile_problem(sa_matrix, np.array(scene_time), [1], [2], [3])
+    for array in (problem.sa_matrix, problem.scene_time, problem.local_matrix, problem.local_time,
+                  problem.scenes, problem.local_index):
+        with pytest.raises(ValueError):
+            array[0] = 0